@@ -0,0 +1,24 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Faculty guessing rules for taltechkoikkavad.py
+
+Programmes missing from the scrape are assigned a teaduskond by these rules,
+checked in order: study field keywords first, then programme code prefixes as
+last resort. They live in their own file so that editing them only
+invalidates the memoized mapping stage, not the read and reduce stages.
+"""
+
+FIELD_KEYWORD_RULES = [
+    ('INFOTEHNOLOOGIA TEADUSKOND', ['informaatika', 'infotehnoloogia', 'arvutiteadus', 'küberturve', 'it']),
+    ('INSENERITEADUSKOND', ['ehitus', 'arhitektuur', 'insener', 'tehnika', 'tehnoloogia', 'energia', 'elektro', 'masina', 'material']),
+    ('LOODUSTEADUSKOND', ['loodus', 'füüsika', 'matemaatika', 'keemia', 'bio', 'geo', 'öko']),
+    ('MAJANDUSTEADUSKOND', ['majandus', 'äri', 'juht', 'õigus', 'avalik', 'poliitika', 'sotsiaal']),
+    ('EESTI MEREAKADEEMIA', ['mere', 'laev', 'vesi', 'sadama'])
+]
+CODE_PREFIX_RULES = [
+    ('INFOTEHNOLOOGIA TEADUSKOND', ('I', 'V')),  # Common IT/CS prefixes
+    ('INSENERITEADUSKOND', ('E', 'M', 'R')),  # Common engineering prefixes
+    ('LOODUSTEADUSKOND', ('L', 'Y', 'K')),  # Common natural sciences prefixes
+    ('MAJANDUSTEADUSKOND', ('T', 'H'))  # Common business/social prefixes
+]
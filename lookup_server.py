@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Programme lookup server for taltechkoikkavad.py output
+
+Loads the latest ETL output once, indexes it by kavakood, by 4-character code
+prefix and by teaduskond, and answers lookups over HTTP on localhost. The
+output file is polled for changes and the index is swapped in one step when
+a new ETL run finishes, so queries never see a half-loaded table.
+
+Usage:
+    python lookup_server.py                                # serve on 127.0.0.1:47616
+    python lookup_server.py --source output/taltechkoikkavad.arrow --poll 5
+
+    GET  /programme/IACB17                                 # one programme
+    GET  /programmes?prefix=IACB&tase=MAGISTRIÕPE          # filter (prefix, teaduskond, tase)
+    GET  /health
+    POST /reload                                           # reload now
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import pandas as pd
+
+from taltechkoikkavad import (ARROW_FILE, OUTPUT_FILE, PARQUET_AVAILABLE, current_arrow_file, load_programmes_arrow,
+                              parse_address)
+
+LOOKUP_SERVER_ADDRESS = ('127.0.0.1', 47616)
+DEFAULT_SOURCE = Path('output') / 'taltechkoikkavad.parquet'
+DEFAULT_POLL_SECONDS = 2.0
+PREFIX_LENGTH = 4
+
+
+def default_source():
+    """The local Arrow or parquet output if there is one, else the CSV output."""
+    if PARQUET_AVAILABLE:
+        if current_arrow_file(ARROW_FILE) is not None:
+            return ARROW_FILE
+        if DEFAULT_SOURCE.exists():
+            return DEFAULT_SOURCE
+    return Path(OUTPUT_FILE)
+
+
+def source_mtime(path):
+    """Modification time of the file behind a source; for Arrow output, its current version."""
+    path = Path(path)
+    if path.suffix == '.arrow':
+        path = current_arrow_file(path) or path
+    return path.stat().st_mtime_ns
+
+
+def load_programme_table(path):
+    """Read an ETL output file (Arrow IPC, parquet, or CSV written by either ETL mode)."""
+    path = Path(path)
+    if path.suffix == '.arrow':
+        return load_programmes_arrow(path)
+    if path.suffix == '.parquet':
+        return pd.read_parquet(path)
+    # --csvetlonly writes ';' with a BOM, --full writes ','
+    df = pd.read_csv(path, sep=';', encoding='utf-8-sig', dtype={'kavakood': str})
+    if len(df.columns) == 1:
+        df = pd.read_csv(path, sep=',', encoding='utf-8-sig', dtype={'kavakood': str})
+    return df
+
+
+class ProgrammeIndex:
+    """Immutable lookup structures over one version of the output table."""
+
+    def __init__(self, df, source=None, mtime=None):
+        df = df.astype(object).where(df.notna(), None)
+        self.rows = df.to_dict('records')
+        self.source = str(source) if source else None
+        self.mtime = mtime
+        self.loaded_at = time.time()
+
+        self.by_code = {}
+        self.by_prefix = {}
+        self.by_school = {}
+        for row in self.rows:
+            code = str(row.get('kavakood'))
+            self.by_code[code.upper()] = row
+            self.by_prefix.setdefault(code[:PREFIX_LENGTH].upper(), []).append(row)
+            self.by_school.setdefault(str(row.get('teaduskond')).upper(), []).append(row)
+
+    @classmethod
+    def from_file(cls, path):
+        path = Path(path)
+        return cls(load_programme_table(path), path, source_mtime(path))
+
+    def get(self, code):
+        return self.by_code.get(code.upper())
+
+    def filter(self, prefix=None, teaduskond=None, tase=None):
+        """Rows matching all given filters, starting from the narrowest index."""
+        candidates = []
+        if prefix:
+            prefix = prefix.upper()
+            if len(prefix) >= PREFIX_LENGTH:
+                candidates.append(self.by_prefix.get(prefix[:PREFIX_LENGTH], []))
+            else:
+                candidates.append([row for key, rows in self.by_prefix.items() if key.startswith(prefix)
+                                   for row in rows])
+        if teaduskond:
+            candidates.append(self.by_school.get(teaduskond.upper(), []))
+        rows = min(candidates, key=len) if candidates else self.rows
+
+        if prefix:
+            rows = [row for row in rows if str(row.get('kavakood')).upper().startswith(prefix)]
+        if teaduskond:
+            rows = [row for row in rows if str(row.get('teaduskond')).upper() == teaduskond.upper()]
+        if tase:
+            rows = [row for row in rows if str(row.get('tase')).upper() == tase.upper()]
+        return rows
+
+    def health(self):
+        return {
+            'ok': True,
+            'rows': len(self.rows),
+            'source': self.source,
+            'loaded_at': self.loaded_at,
+            'prefixes': len(self.by_prefix),
+            'schools': len(self.by_school)
+        }
+
+
+class LookupRequestHandler(BaseHTTPRequestHandler):
+    """JSON endpoints over the server's current index."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        # One reference per request: a hot swap mid-request cannot mix two versions
+        index = self.server.index
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        if url.path.startswith('/programme/'):
+            row = index.get(unquote(url.path[len('/programme/'):]))
+            if row is None:
+                self.reply(404, {'ok': False, 'error': 'programme not found'})
+            else:
+                self.reply(200, row)
+        elif url.path == '/programmes':
+            rows = index.filter(query.get('prefix'), query.get('teaduskond'), query.get('tase'))
+            self.reply(200, {'count': len(rows), 'programmes': rows})
+        elif url.path == '/health':
+            self.reply(200, index.health())
+        else:
+            self.reply(404, {'ok': False, 'error': f"unknown path: {url.path}"})
+
+    def do_POST(self):
+        if urlsplit(self.path).path != '/reload':
+            self.reply(404, {'ok': False, 'error': 'unknown path'})
+            return
+        try:
+            self.server.reload(force=True)
+            self.reply(200, self.server.index.health())
+        except Exception as e:
+            self.reply(500, {'ok': False, 'error': str(e)})
+
+    def reply(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LookupServer(ThreadingHTTPServer):
+    """Serves the index and swaps in a new one when the output file changes."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, source, poll_seconds=DEFAULT_POLL_SECONDS):
+        self.source = Path(source)
+        self.poll_seconds = poll_seconds
+        self.index = ProgrammeIndex.from_file(self.source)
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        super().__init__(address, LookupRequestHandler)
+
+    def reload(self, force=False):
+        """Rebuild the index if the source changed; the swap itself is one assignment."""
+        with self._reload_lock:
+            mtime = source_mtime(self.source)
+            if not force and mtime == self.index.mtime:
+                return False
+            self.index = ProgrammeIndex.from_file(self.source)
+            print(f"Loaded {len(self.index.rows)} programmes from {self.source}")
+            return True
+
+    def watch(self):
+        """Poll the output's modification time until the server stops."""
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.reload()
+            except Exception as e:
+                # Most likely caught the ETL mid-write; keep serving the old index
+                print(f"Reload failed, keeping previous index: {e}")
+
+    def serve_forever(self, poll_interval=0.5):
+        if self.poll_seconds:
+            threading.Thread(target=self.watch, daemon=True).start()
+        try:
+            super().serve_forever(poll_interval)
+        finally:
+            self._stop.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local lookup server over the TalTech programmes output')
+    parser.add_argument('--address', default=f'{LOOKUP_SERVER_ADDRESS[0]}:{LOOKUP_SERVER_ADDRESS[1]}',
+                        metavar='HOST:PORT', help='Local address to listen on')
+    parser.add_argument('--source', default=None, metavar='FILE',
+                        help='ETL output to serve (default: output/taltechkoikkavad.arrow or .parquet, '
+                             'else the CSV)')
+    parser.add_argument('--poll', type=float, default=DEFAULT_POLL_SECONDS, metavar='SECONDS',
+                        help=f'Check the output for changes this often (default: {DEFAULT_POLL_SECONDS}, 0 = never)')
+
+    args = parser.parse_args()
+    source = Path(args.source) if args.source else default_source()
+
+    with LookupServer(parse_address(args.address), source, args.poll) as server:
+        print(f"Serving {len(server.index.rows)} programmes from {source} on http://{args.address}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
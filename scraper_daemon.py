@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Warm browser session daemon for taltechkoikkavad.py
+
+Keeps one headless Edge session open and serves scrape requests over a local
+socket, so scheduled ETL runs skip the browser cold start. The session is
+health-checked before every scrape and recycled after a number of scrapes or
+when the browser's memory use passes a limit.
+
+Usage:
+    python scraper_daemon.py                      # serve on 127.0.0.1:47615
+    python scraper_daemon.py --max-scrapes 20 --max-rss-mb 1500
+    python scraper_daemon.py --status
+    python scraper_daemon.py --stop
+    python taltechkoikkavad.py --full --daemon    # attach from the ETL
+"""
+
+import argparse
+import json
+import socketserver
+import sys
+import threading
+import time
+import warnings
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from taltechkoikkavad import (
+    READY_TIMEOUT,
+    SCRAPER_DAEMON_ADDRESS,
+    create_edge_driver,
+    parse_address,
+    request_scraper_daemon,
+    scrape_with_driver,
+)
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+DEFAULT_MAX_SCRAPES = 50
+DEFAULT_MAX_RSS_MB = 1500
+
+
+class WarmBrowserSession:
+    """Owns the long-lived Edge session and decides when to recycle it."""
+
+    def __init__(self, max_scrapes=DEFAULT_MAX_SCRAPES, max_rss_mb=DEFAULT_MAX_RSS_MB):
+        self.max_scrapes = max_scrapes
+        self.max_rss_mb = max_rss_mb
+        self.driver = None
+        self.scrapes = 0
+        self.total_scrapes = 0
+        self.recycles = 0
+        self.started_at = None
+
+        if max_rss_mb and not PSUTIL_AVAILABLE:
+            warnings.warn("psutil is not installed, RSS-based recycling is disabled.")
+
+    def start(self):
+        """Start a fresh browser session."""
+        self.driver = create_edge_driver()
+        if self.driver is None:
+            raise RuntimeError("EdgeDriver not available")
+        self.scrapes = 0
+        self.started_at = time.time()
+        print(f"Browser session started (pid {self.browser_pid()})")
+
+    def stop(self):
+        """Quit the browser session if one is running."""
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+        self.driver = None
+
+    def recycle(self, reason):
+        """Replace the browser session with a fresh one."""
+        print(f"Recycling browser session: {reason}")
+        self.stop()
+        self.recycles += 1
+        self.start()
+
+    def browser_pid(self):
+        """Return the msedgedriver process id, if known."""
+        try:
+            return self.driver.service.process.pid
+        except AttributeError:
+            return None
+
+    def rss_mb(self):
+        """Resident memory of msedgedriver and all browser processes it spawned."""
+        pid = self.browser_pid()
+        if not PSUTIL_AVAILABLE or pid is None:
+            return None
+        try:
+            root = psutil.Process(pid)
+            processes = [root] + root.children(recursive=True)
+            rss = 0
+            for process in processes:
+                try:
+                    rss += process.memory_info().rss
+                except psutil.Error:
+                    continue
+            return round(rss / (1024 * 1024), 1)
+        except psutil.Error:
+            return None
+
+    def is_alive(self):
+        """Cheap round trip to check the session still responds."""
+        if self.driver is None:
+            return False
+        try:
+            return self.driver.execute_script("return 1") == 1
+        except WebDriverException:
+            return False
+
+    def ensure_healthy(self):
+        """Start, restart or recycle the session so the next scrape runs on a good one."""
+        if self.driver is None:
+            self.start()
+        elif not self.is_alive():
+            self.recycle("session not responding")
+        elif self.max_scrapes and self.scrapes >= self.max_scrapes:
+            self.recycle(f"reached {self.max_scrapes} scrapes")
+        else:
+            rss = self.rss_mb()
+            if self.max_rss_mb and rss is not None and rss > self.max_rss_mb:
+                self.recycle(f"RSS {rss} MB above {self.max_rss_mb} MB")
+
+    def scrape(self, snapshot_path=None, ready_timeout=READY_TIMEOUT):
+        """Run one scrape on the warm session."""
+        self.ensure_healthy()
+        started = time.perf_counter()
+        try:
+            programme_school_map = scrape_with_driver(self.driver, quiet=True, snapshot_path=snapshot_path,
+                                                      ready_timeout=ready_timeout)
+        finally:
+            self.scrapes += 1
+            self.total_scrapes += 1
+        return programme_school_map, round(time.perf_counter() - started, 3)
+
+    def health(self):
+        """Describe the session state for health checks."""
+        return {
+            'ok': True,
+            'alive': self.is_alive(),
+            'scrapes': self.scrapes,
+            'total_scrapes': self.total_scrapes,
+            'recycles': self.recycles,
+            'rss_mb': self.rss_mb(),
+            'uptime_seconds': round(time.time() - self.started_at, 1) if self.started_at else None
+        }
+
+
+class ScraperRequestHandler(socketserver.StreamRequestHandler):
+    """One JSON command per connection: health, scrape or shutdown."""
+
+    def handle(self):
+        session = self.server.session
+        try:
+            command = json.loads(self.rfile.readline() or b'{}')
+            cmd = command.get('cmd')
+
+            if cmd == 'health':
+                reply = session.health()
+            elif cmd == 'scrape':
+                programmes, elapsed = session.scrape(command.get('snapshot_path'),
+                                                     command.get('ready_timeout') or READY_TIMEOUT)
+                reply = {'ok': True, 'programmes': programmes, 'scrapes': session.total_scrapes,
+                         'elapsed_seconds': elapsed}
+                print(f"Scrape #{session.total_scrapes}: {len(programmes)} programmes in {elapsed}s")
+            elif cmd == 'shutdown':
+                reply = {'ok': True}
+                # shutdown() waits for serve_forever, which is busy running this handler
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+            else:
+                reply = {'ok': False, 'error': f"unknown command: {cmd}"}
+
+        except TimeoutException as e:
+            reply = {'ok': False, 'error': e.msg}
+        except Exception as e:
+            # A failed scrape leaves the session in an unknown state, force a health check
+            reply = {'ok': False, 'error': str(e)}
+            if not session.is_alive():
+                session.stop()
+
+        self.wfile.write(json.dumps(reply, ensure_ascii=False).encode('utf-8') + b'\n')
+
+
+class ScraperDaemon(socketserver.TCPServer):
+    """Single-threaded server: scrapes are serialised on the one warm session."""
+
+    allow_reuse_address = True
+
+    def __init__(self, address, session):
+        super().__init__(address, ScraperRequestHandler)
+        self.session = session
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Warm browser session daemon for TalTech scraping')
+    parser.add_argument('--address', default=f'{SCRAPER_DAEMON_ADDRESS[0]}:{SCRAPER_DAEMON_ADDRESS[1]}',
+                        metavar='HOST:PORT', help='Local address to listen on / connect to')
+    parser.add_argument('--max-scrapes', type=int, default=DEFAULT_MAX_SCRAPES,
+                        help=f'Recycle the browser after this many scrapes (default: {DEFAULT_MAX_SCRAPES}, 0 = never)')
+    parser.add_argument('--max-rss-mb', type=float, default=DEFAULT_MAX_RSS_MB,
+                        help=f'Recycle the browser above this resident memory (default: {DEFAULT_MAX_RSS_MB}, '
+                             '0 = never, needs psutil)')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--status', action='store_true', help='Print health of a running daemon')
+    group.add_argument('--stop', action='store_true', help='Stop a running daemon')
+
+    args = parser.parse_args()
+    address = parse_address(args.address)
+
+    if args.status or args.stop:
+        try:
+            reply = request_scraper_daemon({'cmd': 'shutdown' if args.stop else 'health'}, address, timeout=5)
+        except OSError as e:
+            print(f"No scraper daemon at {args.address}: {e}")
+            sys.exit(1)
+        print(json.dumps(reply, indent=2))
+        return
+
+    session = WarmBrowserSession(args.max_scrapes, args.max_rss_mb)
+    session.start()
+
+    with ScraperDaemon(address, session) as server:
+        print(f"Scraper daemon listening on {args.address}")
+        try:
+            server.serve_forever(poll_interval=0.5)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            session.stop()
+            print("Scraper daemon stopped")
+
+
+if __name__ == "__main__":
+    main()
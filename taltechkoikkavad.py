@@ -1,34 +1,349 @@
-import pandas as pd
 import os
 import re
+import shutil
+import codecs
+import contextlib
+import cProfile
+import gzip
+import hashlib
+import importlib
+import importlib.util
+import io
+import json
+import socket
+import threading
+from datetime import datetime
 from pathlib import Path
-try:
-    import pyarrow as pa
-    import pyarrow.parquet as pq
-    PARQUET_AVAILABLE = True
-except ImportError:
-    PARQUET_AVAILABLE = False
-from selenium import webdriver
-from selenium.webdriver.edge.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, WebDriverException
 import time
 import warnings
 
-# Suppress pandas SettingWithCopyWarning
-warnings.filterwarnings('ignore', category=pd.errors.SettingWithCopyWarning)
+import faculty_rules
+from faculty_rules import CODE_PREFIX_RULES, FIELD_KEYWORD_RULES
 
-def scrape_study_programmes():
-    """Scrape study programmes and their schools from TalTech timetable."""
+class _LazyModule:
+    """Stand-in for a heavy module that imports it on first attribute access.
     
-    driver_path = r"C:\edgedriver_win64\msedgedriver.exe"
-    if not os.path.exists(driver_path):
-        warnings.warn(f"EdgeDriver not found at {driver_path}. Please download latest version.")
-        return {}
+    On first use the module global is rebound to the real module, so later
+    lookups cost nothing. Selenium is imported inside the scraping functions
+    instead, because its exception classes are needed in except clauses.
+    """
     
-    service = Service(driver_path)
+    def __init__(self, name, alias):
+        self._name = name
+        self._alias = alias
+    
+    def __getattr__(self, attr):
+        module = importlib.import_module(self._name)
+        globals()[self._alias] = module
+        return getattr(module, attr)
+
+# pandas, numpy and pyarrow load on first use so --scrapeonly, the daemons and
+# tools that only need e.g. find_newest_csv start quickly
+np = _LazyModule('numpy', 'np')
+pd = _LazyModule('pandas', 'pd')
+pa = _LazyModule('pyarrow', 'pa')
+pq = _LazyModule('pyarrow.parquet', 'pq')
+ds = _LazyModule('pyarrow.dataset', 'ds')
+pc = _LazyModule('pyarrow.compute', 'pc')
+pacsv = _LazyModule('pyarrow.csv', 'pacsv')
+pl = _LazyModule('polars', 'pl')
+PARQUET_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+POLARS_AVAILABLE = importlib.util.find_spec('polars') is not None
+WATCHDOG_AVAILABLE = importlib.util.find_spec('watchdog') is not None
+
+# Suppress pandas SettingWithCopyWarning (matched by message, naming the category would import pandas)
+warnings.filterwarnings('ignore', message=r'\s*A value is trying to be set on a copy of a slice')
+
+# Define the exact 5 schools
+VALID_SCHOOLS = (
+    "EESTI MEREAKADEEMIA",
+    "INFOTEHNOLOOGIA TEADUSKOND",
+    "INSENERITEADUSKOND",
+    "LOODUSTEADUSKOND",
+    "MAJANDUSTEADUSKOND"
+)
+VALID_SCHOOLS_UPPER = frozenset(s.upper() for s in VALID_SCHOOLS)
+UNMAPPED_SCHOOL = 'Teaduskond määramata'
+
+# Programme format: "Programme Name (ABCD12):" - note the colon at the end
+PROGRAMME_PATTERN = re.compile(r'^(.+?)\s*\(([A-Z]{4}\d{2})\):?.*$')
+
+TIMETABLE_URL = "https://tunniplaan.taltech.ee/#/public"
+EDGEDRIVER_PATH = r"C:\edgedriver_win64\msedgedriver.exe"
+
+# Local socket of the optional warm-browser scraper daemon (scraper_daemon.py)
+SCRAPER_DAEMON_ADDRESS = ('127.0.0.1', 47615)
+SCRAPER_DAEMON_TIMEOUT = 120  # seconds, covers page load plus readiness wait
+
+# Compressed record of the last live scrape, replayable with --replay
+SNAPSHOT_FILE = Path('output') / 'tunniplaan_snapshot.json.gz'
+
+# Input and output paths
+INPUT_FOLDER = r"C:\Users\siyi.ma\OneDrive - Tallinna Tehnikaülikool\OIS\csv\Otsing_oppekavad"
+OUTPUT_FOLDER = r"C:\Users\siyi.ma\OneDrive - Tallinna Tehnikaülikool\OIS\pysiandmed"
+OUTPUT_FILE = Path(OUTPUT_FOLDER) / "taltechkoikkavad.csv"
+
+# Run-to-run caches (export layouts, stage artifacts)
+CACHE_DIR = Path('output') / 'cache'
+SCHEMA_CACHE_FILE = CACHE_DIR / 'schema_cache.json'
+STAGE_CACHE_DIR = CACHE_DIR / 'stages'
+INCREMENTAL_STATE_FILE = CACHE_DIR / 'incremental_state.pkl'
+EXPORT_MANIFEST_FILE = CACHE_DIR / 'export_manifest.json'
+LAST_RUN_FILE = CACHE_DIR / 'last_run.json'
+
+# Scraped programme→school map: the current copy, plus content-hashed snapshots of every change
+PROGRAMMES_FILE = Path('scraped_programmes.json')
+PROGRAMME_SNAPSHOT_DIR = Path('output') / 'programme_snapshots'
+PROGRAMME_MANIFEST_FILE = PROGRAMME_SNAPSHOT_DIR / 'manifest.json'
+# CSV-only runs refresh a saved map older than this in the background (--max-age)
+PROGRAMME_MAX_AGE_HOURS = 24
+
+# Partitioned output dataset: one directory per faculty and level, files sorted by kavakood
+DATASET_DIR = Path('output') / 'taltechkoikkavad_dataset'
+PARTITION_COLUMNS = ('teaduskond', 'tase')
+DATASET_ROW_GROUP_ROWS = 64 * 1024
+DATASET_COMPRESSION = 'zstd'
+
+# Watch mode: quiet period after the last event on a file, and extra waits while it keeps changing
+WATCH_DEBOUNCE_SECONDS = 3.0
+WATCH_MAX_WAITS = 100
+
+# Per-run profiling reports (--profile)
+PROFILE_DIR = Path('output') / 'profiles'
+
+# Uncompressed Arrow IPC (Feather v2) copy of the output for memory-mapped loading. Each run
+# writes a new content-named version next to it; ARROW_FILE.current names the latest one.
+ARROW_FILE = Path('output') / 'taltechkoikkavad.arrow'
+ARROW_KEEP_VERSIONS = 3
+
+# Batch mode over all exports: one Parquet dataset partitioned by export date
+HISTORY_DATASET_DIR = Path('output') / 'taltechkoikkavad_history'
+EXPORT_DATE_PATTERN = re.compile(r'(\d{4})-?(\d{2})-?(\d{2})')
+
+# Collects every rendered text element in document order in a single WebDriver call.
+# Only school headers and programme-like texts are returned as [text, is_link] pairs,
+# so the payload stays small regardless of DOM size.
+EXTRACT_ENTRIES_JS = r"""
+const schools = new Set(arguments[0]);
+const programme = /\([A-Z]{4}\d{2}\)/;
+const snapshot = document.evaluate('//*[text()]', document, null,
+                                   XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+const entries = [];
+for (let i = 0; i < snapshot.snapshotLength; i++) {
+    const el = snapshot.snapshotItem(i);
+    if (el.getClientRects().length === 0) continue;
+    const text = (el.innerText || '').trim();
+    if (!text || !(schools.has(text) || programme.test(text))) continue;
+    // Links are <a> elements or inside one; pink styling alone does not make a link
+    const isLink = el.closest('a') !== null;
+    entries.push([text, isLink]);
+}
+return entries;
+"""
+
+# Page readiness: deadline for the timetable to render, and how it is judged settled
+READY_TIMEOUT = 15  # seconds
+READY_POLL_INTERVAL = 0.25  # seconds
+READY_STABLE_POLLS = 3  # consecutive observations with an unchanged programme count
+READY_QUIET_MS = 500  # no DOM mutations / network activity for this long
+
+# Installs a MutationObserver and fetch/XHR counters on first call and reports what has
+# rendered so far; resource timing alone misses requests still in flight
+READINESS_PROBE_JS = r"""
+const schools = arguments[0];
+if (!window.__etlReadiness) {
+    const state = {mutations: 0, lastMutation: performance.now(), inflight: 0, lastRequest: 0};
+    new MutationObserver(() => { state.mutations++; state.lastMutation = performance.now(); })
+        .observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+    const started = () => { state.inflight++; state.lastRequest = performance.now(); };
+    const finished = () => { state.inflight--; state.lastRequest = performance.now(); };
+    if (window.fetch) {
+        const fetch = window.fetch;
+        window.fetch = function() { started(); return fetch.apply(this, arguments).finally(finished); };
+    }
+    const send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function() {
+        started();
+        this.addEventListener('loadend', finished);
+        return send.apply(this, arguments);
+    };
+    // The default buffer of 250 entries would freeze the last response time
+    performance.setResourceTimingBufferSize(10000);
+    window.__etlReadiness = state;
+}
+const state = window.__etlReadiness;
+const text = document.body ? document.body.innerText : '';
+const now = performance.now();
+const lastResponse = performance.getEntriesByType('resource')
+    .reduce((latest, r) => Math.max(latest, r.responseEnd), state.lastRequest);
+return {
+    schools: schools.filter(s => text.includes(s)).length,
+    programmes: (text.match(/\([A-Z]{4}\d{2}\)/g) || []).length,
+    mutations: state.mutations,
+    quietMs: now - state.lastMutation,
+    inflight: state.inflight,
+    networkIdleMs: now - lastResponse
+};
+"""
+
+class PageReadiness:
+    """WebDriverWait condition that is met once the timetable has finished rendering.
+    
+    All school headers must be present and the DOM quiet for READY_QUIET_MS. Then either
+    the programme count has stayed the same across READY_STABLE_POLLS observations, or it
+    has held for one and no request is in flight or has finished within READY_QUIET_MS.
+    """
+    
+    def __init__(self, stable_polls=READY_STABLE_POLLS, quiet_ms=READY_QUIET_MS):
+        self.stable_polls = stable_polls
+        self.quiet_ms = quiet_ms
+        self.last_probe = {}
+        self._last_count = None
+        self._stable = 0
+    
+    def __call__(self, driver):
+        probe = driver.execute_script(READINESS_PROBE_JS, list(VALID_SCHOOLS)) or {}
+        self.last_probe = probe
+        
+        count = probe.get('programmes', 0)
+        self._stable = self._stable + 1 if count and count == self._last_count else 0
+        self._last_count = count
+        
+        if probe.get('schools', 0) < len(VALID_SCHOOLS) or probe.get('quietMs', 0) < self.quiet_ms:
+            return False
+        if self._stable >= self.stable_polls:
+            return 'programme-count-stable'
+        if self._stable and probe.get('inflight', 0) == 0 and probe.get('networkIdleMs', 0) >= self.quiet_ms:
+            return 'network-idle'
+        return False
+
+def wait_for_page_ready(driver, timeout=READY_TIMEOUT):
+    """Block until the timetable page is rendered; return how and how fast it got there.
+    
+    Raises TimeoutException if the page is still incomplete at the deadline, so a slow
+    load fails loudly instead of yielding a partial programme map.
+    """
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.support.ui import WebDriverWait
+    
+    condition = PageReadiness()
+    started = time.perf_counter()
+    try:
+        signal = WebDriverWait(driver, timeout, poll_frequency=READY_POLL_INTERVAL).until(condition)
+    except TimeoutException:
+        probe = condition.last_probe
+        raise TimeoutException(
+            f"Timetable not ready after {timeout}s: "
+            f"{probe.get('schools', 0)}/{len(VALID_SCHOOLS)} schools, "
+            f"{probe.get('programmes', 0)} programmes rendered")
+    
+    readiness = {
+        'signal': signal,
+        'waited_seconds': round(time.perf_counter() - started, 3),
+        'schools': condition.last_probe.get('schools'),
+        'programmes': condition.last_probe.get('programmes'),
+        'mutations': condition.last_probe.get('mutations')
+    }
+    print(f"Page ready after {readiness['waited_seconds']}s ({signal}, "
+          f"{readiness['programmes']} programmes)")
+    return readiness
+
+def parse_programme_entries(entries, quiet=False):
+    """Build the programme→school map from ordered (text, is_link) entries."""
+    programme_school_map = {}
+    current_school = UNMAPPED_SCHOOL
+    
+    for text, is_link in entries:
+        text = text.strip()
+        
+        # Skip empty text
+        if not text:
+            continue
+        
+        # Check if this is one of the 5 valid schools (exact match)
+        if text in VALID_SCHOOLS:
+            current_school = text
+            print(f"Found school: {current_school}")
+            continue
+        
+        match = PROGRAMME_PATTERN.match(text)
+        if not match:
+            continue
+        
+        programme_name = match.group(1).strip()
+        full_code = match.group(2)
+        
+        # Skip if programme name is too short or is a school name
+        if len(programme_name) < 3 or programme_name.upper() in VALID_SCHOOLS_UPPER:
+            continue
+        
+        # Skip if element is a link (pink text)
+        if is_link:
+            continue
+        
+        # Only add if we have a valid current school
+        if current_school != UNMAPPED_SCHOOL:
+            # Use full code as key to avoid overwriting programmes with same 4-char prefix
+            programme_school_map[full_code] = {
+                'full_code': full_code,
+                'programme_name': programme_name,
+                'school': current_school
+            }
+            
+            # Only print during scraping, not when loading from JSON
+            if not quiet:
+                print(f"  Programme: {programme_name} ({full_code}) -> {current_school}")
+    
+    return programme_school_map
+
+def save_snapshot(entries, body_text=None, snapshot_path=SNAPSHOT_FILE, readiness=None):
+    """Save extracted page entries as a gzip-compressed JSON snapshot."""
+    snapshot_path = Path(snapshot_path)
+    snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+    snapshot = {
+        'url': TIMETABLE_URL,
+        'captured_at': datetime.now().isoformat(timespec='seconds'),
+        'entries': [[text, bool(is_link)] for text, is_link in entries],
+        'body_text': body_text,
+        'readiness': readiness
+    }
+    with gzip.open(snapshot_path, 'wt', encoding='utf-8') as f:
+        json.dump(snapshot, f, ensure_ascii=False)
+    return snapshot_path
+
+def load_snapshot_entries(snapshot_path):
+    """Load ordered (text, is_link) entries from a snapshot or a saved page text file."""
+    snapshot_path = Path(snapshot_path)
+    
+    if snapshot_path.suffix == '.gz':
+        with gzip.open(snapshot_path, 'rt', encoding='utf-8') as f:
+            snapshot = json.load(f)
+        if snapshot.get('entries'):
+            return [(text, is_link) for text, is_link in snapshot['entries']]
+        body_text = snapshot.get('body_text') or ''
+    else:
+        # Plain body text dump, e.g. full_page_text.txt from test/debug_scraper.py
+        body_text = snapshot_path.read_text(encoding='utf-8')
+    
+    return [(line, False) for line in body_text.split('\n')]
+
+def replay_snapshot(snapshot_path=SNAPSHOT_FILE, quiet=False):
+    """Rebuild the programme→school map from a saved snapshot without starting a browser."""
+    entries = load_snapshot_entries(snapshot_path)
+    programme_school_map = parse_programme_entries(entries, quiet=quiet)
+    print(f"Replayed {len(programme_school_map)} study programmes from {snapshot_path}")
+    return programme_school_map
+
+def create_edge_driver():
+    """Start a headless Edge session, or return None if EdgeDriver is not installed."""
+    if not os.path.exists(EDGEDRIVER_PATH):
+        warnings.warn(f"EdgeDriver not found at {EDGEDRIVER_PATH}. Please download latest version.")
+        return None
+    
+    from selenium import webdriver
+    from selenium.webdriver.edge.service import Service
+    
+    service = Service(EDGEDRIVER_PATH)
     
     options = webdriver.EdgeOptions()
     options.add_argument('--headless')  # Run in background
@@ -39,147 +354,132 @@ def scrape_study_programmes():
     options.add_argument('--disable-extensions')
     options.add_argument('--disable-gpu')
     
-    programme_school_map = {}
+    return webdriver.Edge(service=service, options=options)
+
+def scrape_with_driver(driver, quiet=False, snapshot_path=SNAPSHOT_FILE, ready_timeout=READY_TIMEOUT):
+    """Load the timetable in an existing browser session and extract the programme map."""
+    # A warm session already showing the timetable only needs a reload
+    if driver.current_url == TIMETABLE_URL:
+        driver.refresh()
+    else:
+        driver.get(TIMETABLE_URL)
     
-    # Define the exact 5 schools
-    valid_schools = [
-        "EESTI MEREAKADEEMIA",
-        "INFOTEHNOLOOGIA TEADUSKOND", 
-        "INSENERITEADUSKOND",
-        "LOODUSTEADUSKOND",
-        "MAJANDUSTEADUSKOND"
-    ]
+    # Wait until all schools are rendered and the programme list has settled
+    readiness = wait_for_page_ready(driver, ready_timeout)
     
-    try:
-        driver = webdriver.Edge(service=service, options=options)
-        driver.get("https://tunniplaan.taltech.ee/#/public")
-        
-        # Wait for page to load
-        wait = WebDriverWait(driver, 15)
-        time.sleep(5)  # Allow dynamic content to load
-        
-        current_school = "Teaduskond määramata"
-        
-        # Get page source and split by lines for sequential processing
-        page_source = driver.page_source
+    # Fetch all candidate texts in document order with one round trip, parse locally
+    entries = driver.execute_script(EXTRACT_ENTRIES_JS, list(VALID_SCHOOLS)) or []
+    programme_school_map = parse_programme_entries(entries, quiet=quiet)
+    body_text = None
+    
+    # If no programmes found, try alternative approach with more flexible parsing
+    if not programme_school_map:
+        print("Trying alternative parsing method...")
         
-        # Get all text elements in order
-        all_elements = driver.find_elements(By.XPATH, "//*[text()]")
+        # Get all text content and process line by line
+        from selenium.webdriver.common.by import By
+        body_text = driver.find_element(By.TAG_NAME, "body").text
+        programme_school_map = parse_programme_entries(
+            ((line, False) for line in body_text.split('\n')), quiet=quiet)
+    
+    # Record what was seen so the run can be replayed without a browser
+    if snapshot_path is not None:
+        save_snapshot(entries, body_text, snapshot_path, readiness)
+    
+    return programme_school_map
+
+def request_scraper_daemon(command, address=SCRAPER_DAEMON_ADDRESS, timeout=SCRAPER_DAEMON_TIMEOUT):
+    """Send one JSON command to the scraper daemon and return its JSON reply."""
+    with socket.create_connection(address, timeout=timeout) as sock:
+        sock.sendall(json.dumps(command).encode('utf-8') + b'\n')
+        reply = sock.makefile('rb').readline()
+    if not reply:
+        raise ConnectionError(f"Scraper daemon at {address[0]}:{address[1]} closed the connection")
+    return json.loads(reply)
+
+def scrape_via_daemon(address=SCRAPER_DAEMON_ADDRESS, snapshot_path=SNAPSHOT_FILE, ready_timeout=READY_TIMEOUT):
+    """Scrape through a running scraper_daemon.py; returns None if it is unavailable."""
+    try:
+        health = request_scraper_daemon({'cmd': 'health'}, address, timeout=5)
+        if not health.get('ok'):
+            print(f"Scraper daemon unhealthy: {health.get('error')}")
+            return None
         
-        for element in all_elements:
-            try:
-                text = element.text.strip()
-                
-                # Skip empty text
-                if not text:
-                    continue
-                    
-                # Check if this is one of the 5 valid schools (exact match)
-                if text in valid_schools:
-                    current_school = text
-                    print(f"Found school: {current_school}")
-                    continue
-                
-                # Check if this is a study programme with valid format
-                # Programme format: "Programme Name (ABCD12):" - note the colon at the end
-                programme_pattern = r'^(.+?)\s*\(([A-Z]{4}\d{2})\):?.*$'
-                match = re.match(programme_pattern, text)
-                
-                if match:
-                    programme_name = match.group(1).strip()
-                    full_code = match.group(2)
-                    
-                    # Skip if programme name is too short or is a school name
-                    if (len(programme_name) < 3 or 
-                        programme_name in valid_schools or
-                        programme_name.upper() in [s.upper() for s in valid_schools]):
-                        continue
-                    
-                    # Skip if element is a link (pink text)
-                    try:
-                        if (element.tag_name == 'a' or 
-                            element.find_element(By.XPATH, "./ancestor::a") or
-                            'color' in element.get_attribute('style') and 'rgb(233, 30, 99)' in element.get_attribute('style')):
-                            continue
-                    except:
-                        pass
+        reply = request_scraper_daemon({
+            'cmd': 'scrape',
+            'snapshot_path': str(Path(snapshot_path).resolve()) if snapshot_path is not None else None,
+            'ready_timeout': ready_timeout
+        }, address)
+    except (OSError, ValueError) as e:
+        print(f"Scraper daemon not reachable at {address[0]}:{address[1]} ({e})")
+        return None
+    
+    if not reply.get('ok'):
+        print(f"Scraper daemon failed: {reply.get('error')}")
+        return None
+    
+    print(f"Scraped via daemon (session scrape #{reply.get('scrapes')}, "
+          f"{reply.get('elapsed_seconds')}s)")
+    return reply['programmes']
+
+def scrape_study_programmes(snapshot_path=SNAPSHOT_FILE, ready_timeout=READY_TIMEOUT, daemon_address=None,
+                            quiet=False):
+    """Scrape study programmes and their schools from TalTech timetable (quiet: no per-programme lines)."""
+    
+    # Prefer a warm session from the scraper daemon, fall back to a cold browser start
+    if daemon_address is not None:
+        programme_school_map = scrape_via_daemon(daemon_address, snapshot_path, ready_timeout)
+        if programme_school_map is not None:
+            print_scrape_summary(programme_school_map)
+            return programme_school_map
+        print("Falling back to a local browser session...")
+    
+    from selenium.common.exceptions import TimeoutException, WebDriverException
+    
+    programme_school_map = {}
+    driver = None
+    
+    try:
+        driver = create_edge_driver()
+        if driver is None:
+            return {}
+        programme_school_map = scrape_with_driver(driver, quiet, snapshot_path, ready_timeout)
                     
-                    # Only add if we have a valid current school
-                    if current_school != "Teaduskond määramata":
-                        # Use full code as key to avoid overwriting programmes with same 4-char prefix
-                        programme_school_map[full_code] = {
-                            'full_code': full_code,
-                            'programme_name': programme_name,
-                            'school': current_school
-                        }
-                        
-                        # Only print during scraping, not when loading from JSON
-                        if not hasattr(scrape_study_programmes, '_quiet_mode'):
-                            print(f"  Programme: {programme_name} ({full_code}) -> {current_school}")
-                        
-            except Exception as e:
-                continue
+    except TimeoutException as e:
+        # Do not hand a half-rendered page to the ETL
+        print(f"Scraping aborted: {e.msg}")
+        programme_school_map = {}
         
-        # If no programmes found, try alternative approach with more flexible parsing
-        if not programme_school_map:
-            print("Trying alternative parsing method...")
-            
-            # Get all text content and process line by line
-            body_text = driver.find_element(By.TAG_NAME, "body").text
-            lines = body_text.split('\n')
-            
-            current_school = "Teaduskond määramata"
-            
-            for line in lines:
-                line = line.strip()
-                
-                # Check for school names
-                if line in valid_schools:
-                    current_school = line
-                    print(f"Found school: {current_school}")
-                    continue
-                
-                # Check for programme pattern - updated to handle colon
-                programme_pattern = r'^(.+?)\s*\(([A-Z]{4}\d{2})\):?.*$'
-                match = re.match(programme_pattern, line)
-                
-                if match and current_school != "Teaduskond määramata":
-                    programme_name = match.group(1).strip()
-                    full_code = match.group(2)
-                    
-                    if (len(programme_name) >= 3 and 
-                        programme_name not in valid_schools):
-                        
-                        # Use full code as key to avoid overwriting programmes with same 4-char prefix
-                        programme_school_map[full_code] = {
-                            'full_code': full_code,
-                            'programme_name': programme_name,
-                            'school': current_school
-                        }
-                        
-                        if not hasattr(scrape_study_programmes, '_quiet_mode'):
-                            print(f"  Programme: {programme_name} ({full_code}) -> {current_school}")
-                    
     except WebDriverException as e:
-        error_msg = str(e).lower()
-        if any(keyword in error_msg for keyword in ['version', 'chrome', 'browser', 'driver']):
-            print("\nWARNING: EdgeDriver version mismatch detected!")
-            print("   Your Edge browser may have updated but EdgeDriver hasn't.")
-            print("   Please download the latest EdgeDriver from:")
-            print("   https://developer.microsoft.com/en-us/microsoft-edge/tools/webdriver/")
-            print(f"   Install it to: C:\\edgedriver_win64\\msedgedriver.exe\n")
-        else:
-            print(f"WebDriver error: {e}")
+        report_webdriver_error(e)
         
     except Exception as e:
         print(f"Error during web scraping: {e}")
         
     finally:
-        try:
-            driver.quit()
-        except:
-            pass
+        if driver is not None:
+            try:
+                driver.quit()
+            except:
+                pass
     
+    print_scrape_summary(programme_school_map)
+    return programme_school_map
+
+def report_webdriver_error(e):
+    """Explain a WebDriver failure, pointing out the usual EdgeDriver version mismatch."""
+    error_msg = str(e).lower()
+    if any(keyword in error_msg for keyword in ['version', 'chrome', 'browser', 'driver']):
+        print("\nWARNING: EdgeDriver version mismatch detected!")
+        print("   Your Edge browser may have updated but EdgeDriver hasn't.")
+        print("   Please download the latest EdgeDriver from:")
+        print("   https://developer.microsoft.com/en-us/microsoft-edge/tools/webdriver/")
+        print(f"   Install it to: {EDGEDRIVER_PATH}\n")
+    else:
+        print(f"WebDriver error: {e}")
+
+def print_scrape_summary(programme_school_map):
+    """Print the number of scraped programmes per school."""
     print(f"Scraped {len(programme_school_map)} study programmes")
     
     # Show summary by school
@@ -190,78 +490,229 @@ def scrape_study_programmes():
     
     for school, count in school_counts.items():
         print(f"  {school}: {count} programmes")
+
+def scrape_programmes(ready_timeout=READY_TIMEOUT, daemon_address=None, quiet=False):
+    """Scrape the programme→school map (through the warm daemon session if given, else one browser)."""
+    return scrape_study_programmes(ready_timeout=ready_timeout, daemon_address=daemon_address, quiet=quiet)
+
+def write_json_atomic(path, payload, indent=None):
+    """Write JSON to a temporary file and rename it over path, so readers never see half a file."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=indent)
+    os.replace(tmp, path)
+
+def programme_map_hash(programme_school_map):
+    """Content hash of a programme map, independent of key order."""
+    payload = json.dumps(programme_school_map, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+def diff_programme_maps(old, new):
+    """Codes added and removed, and programmes whose school changed."""
+    return {
+        'added': sorted(set(new) - set(old)),
+        'removed': sorted(set(old) - set(new)),
+        'reassigned': [{'full_code': code, 'from': old[code]['school'], 'to': new[code]['school']}
+                       for code in sorted(set(old) & set(new)) if old[code]['school'] != new[code]['school']]
+    }
+
+def load_programme_manifest(manifest_path=PROGRAMME_MANIFEST_FILE):
+    """Load the history of scraped programme map snapshots."""
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {'current': None, 'snapshots': []}
+
+def save_programme_map(programme_school_map, programmes_file=PROGRAMMES_FILE,
+                       snapshot_dir=PROGRAMME_SNAPSHOT_DIR):
+    """Store a scraped map as a new snapshot if its content changed; return the manifest entry.
     
-    return programme_school_map
+    An unchanged map (same hash as the current snapshot) rewrites nothing, so the saved JSON
+    is not resynced. Otherwise a timestamped snapshot named by its hash is written, the
+    manifest records the diff against the previous map, and programmes_file is replaced.
+    Either way the manifest's checked_at is updated, which is what --max-age measures.
+    """
+    snapshot_dir = Path(snapshot_dir)
+    manifest_path = snapshot_dir / 'manifest.json'
+    manifest = load_programme_manifest(manifest_path)
+    content_hash = programme_map_hash(programme_school_map)
+    manifest['checked_at'] = datetime.now().isoformat(timespec='seconds')
+    
+    if content_hash == manifest['current'] and Path(programmes_file).exists():
+        write_json_atomic(manifest_path, manifest, indent=1)
+        print(f"Programme map unchanged ({content_hash}), keeping {programmes_file}")
+        return dict(manifest['snapshots'][-1], changed=False)
+    
+    # Diff against the current snapshot, or the saved JSON from before snapshots existed
+    previous = {}
+    if manifest['current']:
+        previous_file = snapshot_dir / manifest['snapshots'][-1]['file']
+    else:
+        previous_file = Path(programmes_file)
+    if previous_file.exists():
+        with open(previous_file, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+    diff = diff_programme_maps(previous, programme_school_map)
+    
+    scraped_at = datetime.now()
+    snapshot_file = f"programmes-{scraped_at:%Y%m%dT%H%M%S}-{content_hash}.json"
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    with open(snapshot_dir / snapshot_file, 'w', encoding='utf-8') as f:
+        json.dump(programme_school_map, f, ensure_ascii=False, separators=(',', ':'))
+    
+    entry = {
+        'hash': content_hash,
+        'file': snapshot_file,
+        'scraped_at': scraped_at.isoformat(timespec='seconds'),
+        'programmes': len(programme_school_map),
+        'diff': diff
+    }
+    manifest['current'] = content_hash
+    manifest['snapshots'].append(entry)
+    
+    # Write-then-rename, so a reader never sees half a map
+    write_json_atomic(programmes_file, programme_school_map, indent=2)
+    write_json_atomic(manifest_path, manifest, indent=1)
+    
+    print(f"Programme map changed ({content_hash}): {len(diff['added'])} added, {len(diff['removed'])} removed, "
+          f"{len(diff['reassigned'])} moved to another school")
+    for change in diff['reassigned']:
+        print(f"  {change['full_code']}: {change['from']} -> {change['to']}")
+    return dict(entry, changed=True)
 
 def determine_school_from_programme(programme_name, code):
     """Fallback function - not used when scraping actual school names."""
     return 'Teaduskond määramata'
 
-def find_newest_csv(folder_path):
-    """Find the newest CSV file in the folder by creation date."""
-    folder = Path(folder_path)
-    csv_files = list(folder.glob("*.csv"))
-    
-    if not csv_files:
-        raise FileNotFoundError(f"No CSV files found in {folder_path}")
-    
-    # Sort by creation time (newest first)
-    newest_file = max(csv_files, key=lambda f: f.stat().st_ctime)
-    return newest_file
+def load_export_manifest(manifest_path=EXPORT_MANIFEST_FILE):
+    """Load the per-folder manifests of known exports."""
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {'folders': {}}
 
-def process_taltechkoikkavad():
-    """Replicate Power Query ETL steps to generate taltechkoikkavad.csv."""
+def save_export_manifest(manifest, manifest_path=EXPORT_MANIFEST_FILE):
+    """Persist the export manifest."""
+    write_json_atomic(manifest_path, manifest, indent=2)
+
+def export_content_hash(path, block_size=1024 * 1024):
+    """SHA-1 of a file's bytes, read in blocks."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def scan_exports(folder_path, manifest_path=EXPORT_MANIFEST_FILE):
+    """Update the folder's export manifest and return (entry, new_files).
     
-    # Input and output paths
-    input_folder = r"C:\Users\siyi.ma\OneDrive - Tallinna Tehnikaülikool\OIS\csv\Otsing_oppekavad"
-    output_folder = r"C:\Users\siyi.ma\OneDrive - Tallinna Tehnikaülikool\OIS\pysiandmed"
-    output_file = Path(output_folder) / "taltechkoikkavad.csv"
+    The entry holds name → {size, ctime, mtime_ns, hash} for every CSV plus the newest name.
+    os.scandir gets size and times from the directory listing itself on Windows, so OneDrive
+    placeholders are not hydrated. A content hash is only computed when a known file's size or
+    mtime changes, to tell a real change from a sync client touching it. new_files lists files
+    that are new or changed since the last scan, oldest first.
+    """
+    folder = Path(folder_path)
+    manifest = load_export_manifest(manifest_path)
+    known = manifest['folders'].get(str(folder.resolve()), {}).get('files', {})
     
-    # Ensure output folder exists
-    Path(output_folder).mkdir(parents=True, exist_ok=True)
+    files = {}
+    new_files = []
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if not entry.name.lower().endswith('.csv') or not entry.is_file():
+                continue
+            stat = entry.stat()
+            record = {'size': stat.st_size, 'ctime': stat.st_ctime, 'mtime_ns': stat.st_mtime_ns, 'hash': None}
+            previous = known.get(entry.name)
+            if previous and (previous['size'], previous['mtime_ns']) == (record['size'], record['mtime_ns']):
+                record['hash'] = previous['hash']
+            elif previous:
+                # Hashed the first time it changes, so files that never change are never read
+                record['hash'] = export_content_hash(entry.path)
+                if record['hash'] != previous['hash']:
+                    new_files.append(entry.name)
+            else:
+                new_files.append(entry.name)
+            files[entry.name] = record
     
-    # NEW: Scrape study programmes and schools
-    print("Scraping study programmes from TalTech timetable...")
-    programme_school_map = scrape_study_programmes()
+    newest = max(files, key=lambda name: files[name]['ctime']) if files else None
+    folder_entry = {'files': files, 'newest': newest, 'scanned_at': time.time()}
+    manifest['folders'][str(folder.resolve())] = folder_entry
+    save_export_manifest(manifest, manifest_path)
     
-    # Step 1: Find newest CSV file (equivalent to sorted rows by date created)
-    newest_csv = find_newest_csv(input_folder)
-    print(f"Processing file: {newest_csv}")
+    new_files.sort(key=lambda name: files[name]['ctime'])
+    return folder_entry, [folder / name for name in new_files]
+
+def find_newest_csv(folder_path, manifest_path=EXPORT_MANIFEST_FILE):
+    """Find the newest CSV file in the folder by creation date."""
+    folder_entry, new_files = scan_exports(folder_path, manifest_path)
     
-    # Step 2: Read CSV with specific encoding and delimiter
-    # Try multiple encodings for Baltic characters
-    encodings = ['utf-8-sig', 'windows-1257', 'iso-8859-4', 'utf-8', 'cp1252']
-    df = None
+    if not folder_entry['newest']:
+        raise FileNotFoundError(f"No CSV files found in {folder_path}")
     
-    for encoding in encodings:
+    if new_files:
+        print(f"New exports since last run: {', '.join(f.name for f in new_files)}")
+    return Path(folder_path) / folder_entry['newest']
+
+# Candidate encodings for Baltic characters, in order of preference
+CSV_ENCODINGS = ['utf-8-sig', 'windows-1257', 'iso-8859-4', 'utf-8', 'cp1252']
+ENCODING_SAMPLE_BYTES = 64 * 1024
+
+def detect_encoding(data, sample_size=ENCODING_SAMPLE_BYTES):
+    """Pick the first candidate encoding that decodes a bounded sample of the file."""
+    if data.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    
+    sample = data[:sample_size]
+    is_complete = len(data) <= sample_size
+    for encoding in CSV_ENCODINGS:
         try:
-            df = pd.read_csv(newest_csv, 
-                           delimiter=';', 
-                           encoding=encoding,
-                           header=1,  # Skip first row, use second row as header
-                           skipinitialspace=True)
-            print(f"Successfully read with encoding: {encoding}")
-            break
-        except (UnicodeDecodeError, pd.errors.EmptyDataError):
+            # Incremental decoding tolerates a multi-byte character cut at the sample end
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=is_complete)
+            return encoding
+        except UnicodeDecodeError:
             continue
+    return None
+
+def decode_export(data):
+    """Decode export bytes once with the detected encoding; return (text, encoding)."""
+    encoding = detect_encoding(data)
+    if encoding is not None:
+        try:
+            return data.decode(encoding), encoding
+        except UnicodeDecodeError:
+            # The sample decoded but the rest of the file did not, try the later candidates
+            pass
     
-    if df is None:
-        raise ValueError("Could not read CSV with any supported encoding")
-    
+    start = CSV_ENCODINGS.index(encoding) + 1 if encoding else len(CSV_ENCODINGS)
+    for candidate in CSV_ENCODINGS[start:]:
+        try:
+            return data.decode(candidate), candidate
+        except UnicodeDecodeError:
+            continue
+    raise ValueError("Could not read CSV with any supported encoding")
+
+def clean_column_name(col):
+    """Strip BOM and surrounding whitespace from one header cell."""
+    return str(col).strip().replace('\ufeff', '')
+
+def clean_columns(df):
+    """Strip BOMs and whitespace from column names and drop unnamed columns."""
     # Handle BOM and clean column names
     df.columns = df.columns.str.strip().str.replace('\ufeff', '')
     
     # Drop any columns with blank/NaN/BOM-only names
-    df = df.loc[:, ~df.columns.isin(['', ' ', '\ufeff']) & df.columns.notna()]
-    
-    # Debug: Print available columns
-    print("Available columns:")
-    for i, col in enumerate(df.columns):
-        print(f"{i}: '{col}'")
-    
-    # Map expected columns to actual columns (handle variations)
+    return df.loc[:, ~df.columns.isin(['', ' ', '\ufeff']) & df.columns.notna()]
+
+def map_columns(columns):
+    """Map expected columns to actual export columns (handle variations)."""
     column_mapping = {}
-    for col in df.columns:
+    for col in columns:
         col_lower = col.lower().strip()
         if 'õppekava kood' in col_lower and 'taltech' in col_lower:
             column_mapping['TalTechi õppekava kood'] = col
@@ -283,30 +734,410 @@ def process_taltechkoikkavad():
             column_mapping['peakeel'] = col
         elif 'õppevaldkond' in col_lower:
             column_mapping['õppevaldkond'] = col
+    return column_mapping
+
+REQUIRED_COLUMNS = ['TalTechi õppekava kood', 'maht (EAP)', 'õppekavaversiooni kood']
+
+def header_fingerprint(columns):
+    """Stable fingerprint of an export header row (names and order)."""
+    return hashlib.sha1('\x1f'.join(columns).encode('utf-8')).hexdigest()[:16]
+
+def load_schema_cache(cache_path=SCHEMA_CACHE_FILE):
+    """Load known export layouts keyed by header fingerprint."""
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {'last_fingerprint': None, 'layouts': {}}
+
+_schema_cache_writable = True
+
+def disable_schema_cache_writes():
+    """Pool initializer: batch workers read the schema cache but never replace it."""
+    global _schema_cache_writable
+    _schema_cache_writable = False
+
+def save_schema_cache(cache, cache_path=SCHEMA_CACHE_FILE):
+    """Persist known export layouts."""
+    if not _schema_cache_writable:
+        return
+    write_json_atomic(cache_path, cache, indent=2)
+
+def report_layout_drift(previous_columns, columns):
+    """Print how a new export header differs from the last known layout."""
+    added = [col for col in columns if col not in previous_columns]
+    removed = [col for col in previous_columns if col not in columns]
+    print("Export layout changed since the last run:")
+    if added:
+        print(f"  Added columns: {added}")
+    if removed:
+        print(f"  Removed columns: {removed}")
+    if not added and not removed:
+        print("  Columns reordered")
+
+def resolve_schema(columns, cache_path=SCHEMA_CACHE_FILE):
+    """Return (column_mapping, layout) for an export header.
     
-    # Check if required columns are found
-    required_columns = ['TalTechi õppekava kood', 'maht (EAP)', 'õppekavaversiooni kood']
-    missing_columns = [col for col in required_columns if col not in column_mapping]
+    Known header layouts come straight from the on-disk cache; only unseen layouts
+    go through the fuzzy column matching. Returns (None, None) if required columns
+    cannot be found.
+    """
+    columns = [col for col in columns if col]
+    fingerprint = header_fingerprint(columns)
+    cache = load_schema_cache(cache_path)
+    layout = cache['layouts'].get(fingerprint)
     
-    if missing_columns:
-        print(f"Missing required columns: {missing_columns}")
-        print("Available columns for manual mapping:")
-        for col in df.columns:
-            print(f"  '{col}'")
-        return None
+    if layout is not None:
+        print(f"Known export layout {fingerprint}, using cached column mapping")
+    else:
+        previous = cache['layouts'].get(cache.get('last_fingerprint'))
+        if previous is not None:
+            report_layout_drift(previous['columns'], columns)
+        
+        # Map expected columns to actual columns (handle variations)
+        column_mapping = map_columns(columns)
+        
+        # Check if required columns are found
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in column_mapping]
+        if missing_columns:
+            print(f"Missing required columns: {missing_columns}")
+            print("Available columns for manual mapping:")
+            for col in columns:
+                print(f"  '{col}'")
+            return None, None
+        
+        print(f"New export layout {fingerprint}, column mapping cached")
+        layout = {
+            'columns': columns,
+            'column_mapping': column_mapping,
+            'dtypes': None,
+            'first_seen': datetime.now().isoformat(timespec='seconds')
+        }
+        cache['layouts'][fingerprint] = layout
+    
+    layout['fingerprint'] = fingerprint
+    layout['last_seen'] = datetime.now().isoformat(timespec='seconds')
+    cache['last_fingerprint'] = fingerprint
+    save_schema_cache(cache, cache_path)
+    return layout['column_mapping'], layout
+
+def record_schema_dtypes(layout, df, cache_path=SCHEMA_CACHE_FILE):
+    """Remember the parsed dtypes of the mapped columns for typed reads of this layout."""
+    projected = set(layout['column_mapping'].values())
+    layout['dtypes'] = {col: str(dtype) for col, dtype in df.dtypes.items() if col in projected}
+    cache = load_schema_cache(cache_path)
+    cache['layouts'][layout['fingerprint']] = layout
+    save_schema_cache(cache, cache_path)
+
+def read_export_header(csv_path):
+    """Read only the header row of an export; return (empty frame, read info)."""
+    with open(csv_path, 'rb') as f:
+        head = f.read(ENCODING_SAMPLE_BYTES + 1)
+    encoding = detect_encoding(head)
+    if encoding is None:
+        raise ValueError("Could not read CSV with any supported encoding")
+    
+    df = pd.read_csv(csv_path, delimiter=';', encoding=encoding, header=1,
+                     skipinitialspace=True, nrows=0)
+    print(f"Streaming with encoding: {encoding}")
+    df = clean_columns(df)
+    
+    column_mapping, layout = resolve_schema(df.columns)
+    return df, {'encoding': encoding, 'column_mapping': column_mapping}
+
+# Rows per batch for --chunksize streaming of large exports
+DEFAULT_CHUNKSIZE = 100_000
+
+# Dataframe backends for the read and reduce stages; all produce the same reduced frame
+ENGINES = ('pandas', 'pyarrow', 'polars')
+# pandas' default NA markers, given to the other engines so empty cells match
+CSV_NA_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                 '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+
+# Output columns with few distinct values, stored as categoricals
+CATEGORICAL_COLUMNS = ('teaduskond', 'teaduskond_allikas', 'tase', 'peakeel', 'oppevaldkond', 'programmijuht')
+# Fixed integer dtypes for the count columns, so every run and export writes the same schema
+COMPACT_INT_DTYPES = {'maht': 'int16', 'nominaalne_oppeaeg': 'int8'}
+
+def _fold_latest(state, chunk, kava_col, version_col, value_cols):
+    """Merge one batch into the running per-programme latest-version state.
+    
+    For every column the state keeps the first non-empty value in version-descending
+    order together with the version it came from, which is exactly what
+    sort_values(version, ascending=False).groupby(kava).first() yields on the full file.
+    """
+    version = chunk[version_col]
+    for col in value_cols:
+        chunk['__v_' + col] = version.where(chunk[col].notna())
+    
+    chunk = chunk.sort_values(version_col, ascending=False, kind='stable')
+    latest = chunk.groupby(kava_col).first()
+    if state is None:
+        return latest
+    
+    index = state.index.union(latest.index)
+    state = state.reindex(index)
+    latest = latest.reindex(index)
+    for col in value_cols:
+        old_version, new_version = state['__v_' + col], latest['__v_' + col]
+        # Newer version wins; a value with a known version beats one without
+        take_new = latest[col].notna() & (
+            state[col].isna() |
+            (new_version > old_version) |
+            (old_version.isna() & new_version.notna()))
+        state[col] = state[col].where(~take_new, latest[col])
+        state['__v_' + col] = old_version.where(~take_new, new_version)
+    return state
+
+def _fold_batches(reader, kava_col, version_col, maht_col):
+    """Fold every batch of a chunked reader; returns (state, columns, rows read)."""
+    state = None
+    columns = None
+    rows = 0
+    for chunk in reader:
+        chunk = clean_columns(chunk)
+        columns = columns or list(chunk.columns)
+        rows += len(chunk)
+        
+        chunk = chunk[chunk[maht_col].notna() & (chunk[maht_col] != '')]
+        chunk = chunk[chunk[kava_col].notna()]
+        if chunk.empty:
+            continue
+        
+        value_cols = [c for c in chunk.columns if c != kava_col]
+        state = _fold_latest(state, chunk.copy(), kava_col, version_col, value_cols)
+    return state, columns, rows
+
+def reduce_latest_versions_chunked(csv_path, encoding, column_mapping, chunksize=DEFAULT_CHUNKSIZE):
+    """Stream an export in row batches, keeping only the latest version of each programme.
+    
+    Peak memory is bounded by one batch plus one row per distinct programme code,
+    independent of how many versions the export holds.
+    """
+    kava_col = column_mapping['TalTechi õppekava kood']
+    version_col = column_mapping['õppekavaversiooni kood']
+    maht_col = column_mapping['maht (EAP)']
+    wanted = set(column_mapping.values())
+    
+    # Values stay text in every batch so all batches agree on dtypes; only a numeric
+    # version column keeps its numeric ordering
+    sample = pd.read_csv(csv_path, delimiter=';', encoding=encoding, header=1,
+                         skipinitialspace=True, nrows=1000)
+    raw_columns = {col.strip().replace('\ufeff', ''): col for col in sample.columns}
+    version_dtype = 'float64' if pd.api.types.is_numeric_dtype(sample[raw_columns[version_col]]) else str
+    dtypes = {raw_columns[col]: str for col in wanted}
+    batch_options = {'delimiter': ';', 'encoding': encoding, 'header': 1, 'skipinitialspace': True,
+                     'chunksize': chunksize, 'usecols': list(dtypes)}
+    
+    try:
+        reader = pd.read_csv(csv_path, dtype={**dtypes, raw_columns[version_col]: version_dtype}, **batch_options)
+        state, columns, rows = _fold_batches(reader, kava_col, version_col, maht_col)
+    except ValueError as e:
+        if version_dtype is str:
+            raise
+        # A text version after the sample: the full read compares every version as text then
+        print(f"Version column is not numeric after all ({e}), re-reading versions as text")
+        reader = pd.read_csv(csv_path, dtype=dtypes, **batch_options)
+        state, columns, rows = _fold_batches(reader, kava_col, version_col, maht_col)
+    
+    if state is None:
+        return pd.DataFrame(columns=columns or [kava_col])
+    
+    value_cols = [c for c in columns if c != kava_col]
+    df_grouped = state.sort_index()[value_cols].rename_axis(kava_col).reset_index()
+    
+    # groupby().first() yields None for text columns without any value in a group
+    for col in value_cols:
+        if df_grouped[col].dtype == object:
+            df_grouped[col] = df_grouped[col].where(df_grouped[col].notna(), None)
+    print(f"Streamed {rows:,} rows in batches of {chunksize:,}, kept {len(df_grouped):,} programmes")
+    return df_grouped
+
+def read_export_text(csv_path):
+    """Read an Otsing_oppekavad export with a single file read and a single decode.
+    
+    Returns the decoded text and a dict recording the chosen encoding and timings.
+    """
+    started = time.perf_counter()
+    data = Path(csv_path).read_bytes()
+    read_done = time.perf_counter()
+    
+    text, encoding = decode_export(data)
+    decode_done = time.perf_counter()
+    
+    read_info = {
+        'encoding': encoding,
+        'bytes': len(data),
+        'read_seconds': round(read_done - started, 4),
+        'decode_seconds': round(decode_done - read_done, 4)
+    }
+    print(f"Successfully read with encoding: {encoding} "
+          f"({len(data):,} bytes, read {read_info['read_seconds']}s, decode {read_info['decode_seconds']}s)")
+    return text, read_info
+
+def parse_export(text, engine='pandas'):
+    """Resolve the export layout and parse the decoded text once.
+    
+    Returns (frame with cleaned column names, column_mapping); column_mapping is
+    None if required columns are missing. With engine='pyarrow' or 'polars' the
+    frame is an Arrow table or Polars frame holding only the columns the output needs.
+    """
+    read_options = {'delimiter': ';', 
+                    'header': 1,  # Skip first row, use second row as header
+                    'skipinitialspace': True}
+    try:
+        header = pd.read_csv(io.StringIO(text), nrows=0, **read_options)
+    except pd.errors.EmptyDataError:
+        raise ValueError("Could not read CSV with any supported encoding")
+    
+    column_mapping, layout = resolve_schema(clean_columns(header.copy()).columns)
+    if column_mapping is None:
+        return clean_columns(header), None
+    
+    if engine == 'pyarrow':
+        return parse_export_arrow(text, header, column_mapping), column_mapping
+    if engine == 'polars':
+        return parse_export_polars(text, header, column_mapping), column_mapping
+    
+    df = None
+    if layout.get('dtypes'):
+        # Known layout: parse only the mapped columns, with the dtypes seen before
+        raw_names = {clean_column_name(col): col for col in header.columns}
+        usecols = [raw_names[col] for col in layout['dtypes'] if col in raw_names]
+        # Versions are still inferred: a cached text dtype would sort numeric versions as strings
+        version_col = column_mapping['õppekavaversiooni kood']
+        dtypes = {raw_names[col]: dtype for col, dtype in layout['dtypes'].items()
+                  if col in raw_names and col != version_col}
+        try:
+            df = pd.read_csv(io.StringIO(text), usecols=usecols, dtype=dtypes, **read_options)
+        except (ValueError, TypeError) as e:
+            print(f"Cached dtypes no longer fit this export ({e}), re-reading untyped")
+    
+    if df is None:
+        df = clean_columns(pd.read_csv(io.StringIO(text), **read_options))
+        record_schema_dtypes(layout, df)
+    else:
+        df = clean_columns(df)
+    return df, column_mapping
+
+def reduce_input_columns(column_mapping):
+    """Export columns (cleaned names) the reduce and type stages read."""
+    columns = list(output_source_columns(column_mapping).values())
+    version_col = column_mapping['õppekavaversiooni kood']
+    return columns if version_col in columns else columns + [version_col]
+
+def parse_export_arrow(text, header, column_mapping):
+    """Multithreaded Arrow CSV parse of the needed columns, matching pandas' inference."""
+    raw_names = {clean_column_name(col): col for col in header.columns}
+    read_options = pacsv.ReadOptions(skip_rows=2, column_names=list(header.columns), use_threads=True)
+    convert_options = pacsv.ConvertOptions(
+        include_columns=[raw_names[col] for col in reduce_input_columns(column_mapping)],
+        null_values=CSV_NA_VALUES, strings_can_be_null=True,
+        true_values=['True', 'TRUE', 'true'], false_values=['False', 'FALSE', 'false'])
+    table = pacsv.read_csv(io.BytesIO(text.encode('utf-8')), read_options=read_options,
+                           parse_options=pacsv.ParseOptions(delimiter=';'), convert_options=convert_options)
+    
+    columns = []
+    for column in table.columns:
+        # pandas keeps dates as text
+        if pa.types.is_temporal(column.type):
+            column = column.cast(pa.string())
+        # skipinitialspace, and a cell of only spaces is empty
+        if pa.types.is_string(column.type):
+            column = pc.utf8_ltrim(column, characters=' ')
+            column = pc.if_else(pc.equal(column, ''), pa.scalar(None, pa.string()), column)
+        columns.append(column)
+    return pa.table(columns, names=[clean_column_name(name) for name in table.column_names])
+
+def parse_export_polars(text, header, column_mapping):
+    """Multithreaded Polars CSV parse of the needed columns, matching pandas' inference."""
+    positions = {clean_column_name(col): i for i, col in enumerate(header.columns)}
+    needed = sorted(reduce_input_columns(column_mapping), key=positions.get)
+    # Everything is read as text first; inferring from a sample could disagree with pandas,
+    # which looks at the whole column
+    df = pl.read_csv(io.BytesIO(text.encode('utf-8')), separator=';', has_header=False, skip_rows=2,
+                     columns=[positions[col] for col in needed], null_values=CSV_NA_VALUES,
+                     infer_schema_length=0)
+    df.columns = needed
     
+    # skipinitialspace, and a cell of only spaces is empty
+    df = df.with_columns([pl.col(col).str.strip_chars_start(' ').replace('', None) for col in needed])
+    
+    # Same inference order as pandas: integer, then float, else text
+    columns = []
+    for col in needed:
+        for dtype in (pl.Int64, pl.Float64):
+            try:
+                columns.append(df[col].cast(dtype, strict=True))
+                break
+            except pl.exceptions.InvalidOperationError:
+                continue
+        else:
+            columns.append(df[col])
+    return pl.DataFrame(columns)
+
+def reduce_latest_versions(df, column_mapping):
+    """Keep the latest version of each programme from a fully parsed export."""
     # Step 3: Clean data - remove rows where "maht (EAP)" is empty
     maht_col = column_mapping['maht (EAP)']
+    kava_col = column_mapping['TalTechi õppekava kood']
+    version_col = column_mapping['õppekavaversiooni kood']
     df_clean = df[df[maht_col].notna() & (df[maht_col] != '')]
     
     # Step 4: Group by full TalTechi õppekava kood, sort by version descending, take first
     # This ensures we get the latest version of each programme
+    df_sorted = df_clean.sort_values(version_col, ascending=False)
+    return df_sorted.groupby(kava_col).first().reset_index()
+
+def reduce_latest_versions_arrow(table, column_mapping):
+    """reduce_latest_versions on an Arrow table with Arrow compute kernels; returns pandas."""
+    maht_col = column_mapping['maht (EAP)']
     kava_col = column_mapping['TalTechi õppekava kood']
     version_col = column_mapping['õppekavaversiooni kood']
-    df_sorted = df_clean.sort_values(version_col, ascending=False)
-    df_grouped = df_sorted.groupby(kava_col).first().reset_index()
     
-    # Step 5: Select and rename columns using mapped column names
+    keep = pc.is_valid(table[maht_col])
+    if pa.types.is_string(table[maht_col].type):
+        keep = pc.and_(keep, pc.not_equal(table[maht_col], ''))
+    table = table.filter(pc.and_(keep, pc.is_valid(table[kava_col])))
+    
+    # Sorted newest first, the first non-null value per column equals pandas' groupby().first()
+    table = table.sort_by([(version_col, 'descending')])
+    others = [col for col in table.column_names if col != kava_col]
+    grouped = table.group_by(kava_col, use_threads=False).aggregate([(col, 'first') for col in others])
+    grouped = grouped.rename_columns([name.removesuffix('_first') for name in grouped.column_names])
+    grouped = grouped.select([kava_col] + others).sort_by(kava_col)
+    return grouped.to_pandas()
+
+def reduce_latest_versions_polars(df, column_mapping):
+    """reduce_latest_versions on a Polars frame; returns pandas."""
+    maht_col = column_mapping['maht (EAP)']
+    kava_col = column_mapping['TalTechi õppekava kood']
+    version_col = column_mapping['õppekavaversiooni kood']
+    
+    keep = pl.col(maht_col).is_not_null() & pl.col(kava_col).is_not_null()
+    if df.schema[maht_col] == pl.String:
+        keep = keep & (pl.col(maht_col) != '')
+    
+    # Sorted newest first, the first non-null value per column equals pandas' groupby().first()
+    grouped = (df.filter(keep)
+                 .sort(version_col, descending=True, nulls_last=True)
+                 .group_by(kava_col)
+                 .agg(pl.all().drop_nulls().first())
+                 .sort(kava_col))
+    return grouped.select([kava_col] + [col for col in df.columns if col != kava_col]).to_pandas()
+
+def resolve_engine(engine):
+    """Return the engine to use, falling back to pandas if its library is not installed."""
+    if engine == 'pyarrow' and not PARQUET_AVAILABLE:
+        warnings.warn("pyarrow is not installed, using the pandas engine.")
+        return 'pandas'
+    if engine == 'polars' and not POLARS_AVAILABLE:
+        warnings.warn("polars is not installed (pip install polars), using the pandas engine.")
+        return 'pandas'
+    return engine
+
+def output_source_columns(column_mapping):
+    """Map output column names to the export columns they come from, skipping ones not found."""
     output_columns = {
         'kavakood': column_mapping.get('TalTechi õppekava kood'),
         'nimetusek': column_mapping.get('nimetus e.k.'),
@@ -318,9 +1149,12 @@ def process_taltechkoikkavad():
         'peakeel': column_mapping.get('peakeel'),
         'oppevaldkond': column_mapping.get('õppevaldkond')
     }
-    
-    # Filter out columns that weren't found
-    available_columns = {k: v for k, v in output_columns.items() if v is not None}
+    return {k: v for k, v in output_columns.items() if v is not None}
+
+def type_programmes(df_grouped, column_mapping):
+    """Select, rename and type the output columns."""
+    # Step 5: Select and rename columns using mapped column names
+    available_columns = output_source_columns(column_mapping)
     
     # Select available columns and rename
     df_final = df_grouped[list(available_columns.values())].copy()
@@ -350,110 +1184,947 @@ def process_taltechkoikkavad():
     if 'oppevaldkond' in df_final.columns:
         df_final['oppevaldkond'] = df_final['oppevaldkond'].astype(str)
     
-    # Step 7.5: Add teaduskond mapping
-    if 'kavakood' in df_final.columns:
-        # Create a lookup dictionary from full_code to school
-        code_to_school = {}
-        for full_code, info in programme_school_map.items():
-            school = info['school']
-            code_to_school[full_code] = school
-        
-        # First pass: direct mapping from scraped data
-        df_final['teaduskond'] = df_final['kavakood'].map(
-            lambda x: code_to_school.get(x, 'Teaduskond määramata')
-        )
-        
-        # Add mapping source column
-        df_final['teaduskond_allikas'] = df_final['kavakood'].map(
-            lambda x: 'Scraped' if x in code_to_school else 'Unmapped'
-        )
-        
-        mapped_count = sum(df_final['teaduskond'] != 'Teaduskond määramata')
-        unmapped_count = sum(df_final['teaduskond'] == 'Teaduskond määramata')
-        print(f"Mapped {mapped_count} programmes to schools (from {len(programme_school_map)} scraped programmes)")
-        print(f"Unmapped programmes: {unmapped_count}")
-        
-        # Debug: Show which programmes were mapped
-        mapped_programmes = df_final[df_final['teaduskond_allikas'] == 'Scraped']['kavakood'].tolist()
-        print(f"Scraped programmes found in CSV: {len(mapped_programmes)}")
-        if len(mapped_programmes) < len(programme_school_map):
-            scraped_codes = set(programme_school_map.keys())
-            csv_codes = set(df_final['kavakood'].tolist())
-            missing_in_csv = scraped_codes - csv_codes
-            print(f"Scraped codes not found in CSV ({len(missing_in_csv)}): {sorted(missing_in_csv)}")
-        
-        # Second pass: educated guessing for unmapped programmes
-        if unmapped_count > 0:
-            print("Making educated guesses for unmapped programmes based on study fields...")
-            
-            def guess_teaduskond(row):
-                if row['teaduskond'] != 'Teaduskond määramata':
-                    return row['teaduskond'], row['teaduskond_allikas']
-                
-                # Get study field and group for guessing
-                oppevaldkond = str(row.get('oppevaldkond', '')).lower() if 'oppevaldkond' in row else ''
-                
-                # Educated guessing based on study field patterns
-                if any(word in oppevaldkond for word in ['informaatika', 'infotehnoloogia', 'arvutiteadus', 'küberturve', 'it']):
-                    return 'INFOTEHNOLOOGIA TEADUSKOND', 'Guessed'
-                elif any(word in oppevaldkond for word in ['ehitus', 'arhitektuur', 'insener', 'tehnika', 'tehnoloogia', 'energia', 'elektro', 'masina', 'material']):
-                    return 'INSENERITEADUSKOND', 'Guessed'
-                elif any(word in oppevaldkond for word in ['loodus', 'füüsika', 'matemaatika', 'keemia', 'bio', 'geo', 'öko']):
-                    return 'LOODUSTEADUSKOND', 'Guessed'
-                elif any(word in oppevaldkond for word in ['majandus', 'äri', 'juht', 'õigus', 'avalik', 'poliitika', 'sotsiaal']):
-                    return 'MAJANDUSTEADUSKOND', 'Guessed'
-                elif any(word in oppevaldkond for word in ['mere', 'laev', 'vesi', 'sadama']):
-                    return 'EESTI MEREAKADEEMIA', 'Guessed'
-                else:
-                    # Look at programme code patterns as last resort
-                    kavakood = str(row.get('kavakood', ''))
-                    if kavakood.startswith(('I', 'V')):  # Common IT/CS prefixes
-                        return 'INFOTEHNOLOOGIA TEADUSKOND', 'Guessed'
-                    elif kavakood.startswith(('E', 'M', 'R')):  # Common engineering prefixes
-                        return 'INSENERITEADUSKOND', 'Guessed'
-                    elif kavakood.startswith(('L', 'Y', 'K')):  # Common natural sciences prefixes
-                        return 'LOODUSTEADUSKOND', 'Guessed'
-                    elif kavakood.startswith(('T', 'H')):  # Common business/social prefixes
-                        return 'MAJANDUSTEADUSKOND', 'Guessed'
-                    elif kavakood.startswith('V') and 'meer' in oppevaldkond:  # Marine
-                        return 'EESTI MEREAKADEEMIA', 'Guessed'
-                    else:
-                        return 'Teaduskond määramata', 'Unmapped'
-            
-            # Apply guessing function
-            guessing_results = df_final.apply(guess_teaduskond, axis=1, result_type='expand')
-            df_final['teaduskond'] = guessing_results[0]
-            df_final['teaduskond_allikas'] = guessing_results[1]
-            
-            # Report guessing results
-            final_unmapped = sum(df_final['teaduskond'] == 'Teaduskond määramata')
-            guessed_count = sum(df_final['teaduskond_allikas'] == 'Guessed')
-            print(f"Guessed {guessed_count} additional programmes")
-            print(f"Still unmapped: {final_unmapped}")
-            
-            # Show breakdown by source
-            source_counts = df_final['teaduskond_allikas'].value_counts()
-            print("\nMapping source breakdown:")
-            for source, count in source_counts.items():
-                print(f"  {source}: {count}")
+    return df_final
+
+# One compiled alternation per school instead of a Python-level any() per row
+FIELD_KEYWORD_PATTERNS = [(school, re.compile('|'.join(re.escape(word) for word in words)))
+                          for school, words in FIELD_KEYWORD_RULES]
+
+def _first_matching_school(values, rules):
+    """Evaluate ordered (school, predicate) rules once per distinct value.
     
-    # Step 8: Save to CSV
-    df_final.to_csv(output_file, index=False, encoding='utf-8')
+    Returns an object array aligned with values holding the first matching school or None.
+    """
+    codes, uniques = pd.factorize(values)
+    matched = np.array([next((school for school, predicate in rules if predicate(value)), None)
+                        for value in uniques], dtype=object)
+    result = np.full(len(values), None, dtype=object)
+    result[codes >= 0] = matched[codes[codes >= 0]]
+    return result
+
+def assign_teaduskond(df_final, programme_school_map):
+    """Add teaduskond and teaduskond_allikas columns: scraped lookup first, then guessing."""
+    # Create a lookup from full_code to school
+    code_to_school = pd.Series({full_code: info['school'] for full_code, info in programme_school_map.items()},
+                               dtype=object)
+    kavakood = df_final['kavakood'].astype(str)
     
-    # Save parquet version to output folder
+    # First pass: direct mapping from scraped data (one hash lookup for the whole column)
+    scraped_school = kavakood.map(code_to_school).to_numpy(dtype=object)
+    is_scraped = pd.notna(scraped_school)
+    
+    mapped_count = int(is_scraped.sum())
+    unmapped_count = len(df_final) - mapped_count
+    print(f"Mapped {mapped_count} programmes to schools (from {len(programme_school_map)} scraped programmes)")
+    print(f"Unmapped programmes: {unmapped_count}")
+    
+    # Debug: Show which programmes were mapped
+    print(f"Scraped programmes found in CSV: {mapped_count}")
+    if mapped_count < len(programme_school_map):
+        missing_in_csv = set(programme_school_map.keys()) - set(kavakood)
+        print(f"Scraped codes not found in CSV ({len(missing_in_csv)}): {sorted(missing_in_csv)}")
+    
+    conditions = [is_scraped]
+    schools = [scraped_school]
+    sources = ['Scraped']
+    
+    # Second pass: educated guessing for unmapped programmes
+    if unmapped_count > 0:
+        print("Making educated guesses for unmapped programmes based on study fields...")
+        
+        # Study fields and code prefixes have few distinct values, so rules run per value
+        if 'oppevaldkond' in df_final.columns:
+            oppevaldkond = df_final['oppevaldkond'].astype(str).str.lower()
+        else:
+            oppevaldkond = pd.Series('', index=df_final.index)
+        field_school = _first_matching_school(
+            oppevaldkond, [(school, pattern.search) for school, pattern in FIELD_KEYWORD_PATTERNS])
+        prefix_school = _first_matching_school(
+            kavakood.str[:1], [(school, lambda first, p=prefixes: first.startswith(p))
+                               for school, prefixes in CODE_PREFIX_RULES])
+        
+        conditions += [pd.notna(field_school), pd.notna(prefix_school)]
+        schools += [field_school, prefix_school]
+        sources += ['Guessed', 'Guessed']
+    
+    df_final['teaduskond'] = np.select(conditions, schools, default=UNMAPPED_SCHOOL)
+    df_final['teaduskond_allikas'] = np.select(conditions, sources, default='Unmapped')
+    
+    if unmapped_count > 0:
+        final_guessed = int((df_final['teaduskond_allikas'] == 'Guessed').sum())
+        final_unmapped = int((df_final['teaduskond_allikas'] == 'Unmapped').sum())
+        print(f"Guessed {final_guessed} additional programmes")
+        print(f"Final mapping: {mapped_count} scraped, {final_guessed} guessed, {final_unmapped} unmapped")
+    
+    return df_final
+
+def compact_programmes(df_final):
+    """Store repetitive text columns as categoricals and counts in fixed small integer dtypes."""
+    df_final = df_final.copy()
+    for col in CATEGORICAL_COLUMNS:
+        if col in df_final.columns:
+            df_final[col] = df_final[col].astype('category')
+    for col, dtype in COMPACT_INT_DTYPES.items():
+        if col in df_final.columns:
+            df_final[col] = df_final[col].astype(dtype)
+    return df_final
+
+def report_memory(before, after):
+    """Print bytes per column before and after compaction."""
+    before_bytes = before.memory_usage(deep=True, index=False)
+    after_bytes = after.memory_usage(deep=True, index=False)
+    print("Memory per column (bytes):")
+    print(f"  {'column':<20} {'before':>10} {'after':>10}  dtype")
+    for col in after.columns:
+        print(f"  {col:<20} {before_bytes[col]:>10,} {after_bytes[col]:>10,}  {before[col].dtype} -> {after[col].dtype}")
+    print(f"  {'total':<20} {before_bytes.sum():>10,} {after_bytes.sum():>10,}")
+
+def write_partitioned_dataset(df_final, dataset_dir=DATASET_DIR, partition_cols=PARTITION_COLUMNS):
+    """Write the table as a Hive-partitioned Parquet dataset for predicate pushdown.
+    
+    Files are zstd-compressed with min/max statistics, sorted by kavakood (recorded as
+    sorting_columns metadata) and split into row groups of DATASET_ROW_GROUP_ROWS, so
+    readers filtering on a partition or a kavakood range skip whole files and row groups.
+    The dataset is rebuilt in a temporary directory and swapped in, dropping stale partitions.
+    """
+    dataset_dir = Path(dataset_dir)
+    partition_cols = [col for col in partition_cols if col in df_final.columns]
+    sort_cols = partition_cols + (['kavakood'] if 'kavakood' in df_final.columns else [])
+    table = pa.Table.from_pandas(df_final.sort_values(sort_cols), preserve_index=False)
+    
+    file_columns = [name for name in table.schema.names if name not in partition_cols]
+    sorting_columns = [pq.SortingColumn(file_columns.index('kavakood'))] if 'kavakood' in file_columns else None
+    file_options = ds.ParquetFileFormat().make_write_options(compression=DATASET_COMPRESSION, use_dictionary=True,
+                                                             write_statistics=True, sorting_columns=sorting_columns)
+    
+    tmp_dir = dataset_dir.with_name(dataset_dir.name + '.tmp')
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    ds.write_dataset(table, tmp_dir, format='parquet', file_options=file_options,
+                     partitioning=ds.partitioning(table.select(partition_cols).schema, flavor='hive'),
+                     max_rows_per_group=DATASET_ROW_GROUP_ROWS, basename_template='part-{i}.parquet')
+    
+    old_dir = dataset_dir.with_name(dataset_dir.name + '.old')
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if dataset_dir.exists():
+        os.replace(dataset_dir, old_dir)
+    os.replace(tmp_dir, dataset_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return dataset_dir
+
+def arrow_pointer_file(arrow_file=ARROW_FILE):
+    """Small text file naming the current versioned Arrow file."""
+    arrow_file = Path(arrow_file)
+    return arrow_file.with_name(f"{arrow_file.name}.current")
+
+def current_arrow_file(arrow_file=ARROW_FILE):
+    """The Arrow file to read for arrow_file: the current version, or arrow_file itself; None if neither exists."""
+    arrow_file = Path(arrow_file)
+    try:
+        version = arrow_file.with_name(arrow_pointer_file(arrow_file).read_text(encoding='utf-8').strip())
+        if version.exists():
+            return version
+    except FileNotFoundError:
+        pass
+    return arrow_file if arrow_file.exists() else None
+
+def write_arrow_file(df_final, arrow_file=ARROW_FILE):
+    """Write the table as an uncompressed Arrow IPC (Feather v2) file for memory-mapped reads.
+    
+    Uncompressed buffers can be used straight from the page cache. Every version gets its
+    own file named by content hash and the pointer file is switched to it, so an existing
+    file is never replaced: on Windows a file that a reader still maps cannot be. Old
+    versions beyond ARROW_KEEP_VERSIONS are removed once nobody has them open.
+    """
+    arrow_file = Path(arrow_file)
+    arrow_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = arrow_file.with_name(f"{arrow_file.name}.{os.getpid()}.tmp")
+    table = pa.Table.from_pandas(df_final, preserve_index=False)
+    with pa.OSFile(str(tmp), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    
+    version = arrow_file.with_name(f"{arrow_file.stem}-{export_content_hash(tmp)[:16]}{arrow_file.suffix}")
+    if version.exists():
+        os.remove(tmp)
+    else:
+        os.replace(tmp, version)
+    
+    try:
+        pointer = arrow_pointer_file(arrow_file)
+        pointer_tmp = pointer.with_name(f"{pointer.name}.{os.getpid()}.tmp")
+        pointer_tmp.write_text(version.name, encoding='utf-8')
+        os.replace(pointer_tmp, pointer)
+    except OSError as e:
+        # Readers hold the pointer only for a moment; the next run switches it
+        warnings.warn(f"Could not update {pointer.name} ({e}), readers still get the previous version.")
+        return version
+    
+    older = sorted((f for f in arrow_file.parent.glob(f"{arrow_file.stem}-*{arrow_file.suffix}") if f != version),
+                   key=lambda f: f.stat().st_mtime, reverse=True)
+    for stale in older[ARROW_KEEP_VERSIONS - 1:]:
+        try:
+            stale.unlink()
+        except OSError:
+            pass  # still mapped by a reader; removed by a later run
+    return version
+
+def load_programmes_arrow(arrow_file=ARROW_FILE, as_pandas=True):
+    """Open the current Arrow IPC output memory-mapped, without decoding or copying it.
+    
+    With as_pandas=False the pyarrow Table is returned and its columns point into the
+    mapping, which stays open as long as the table lives. With as_pandas=True the data is
+    copied into pandas and the mapping is closed before returning.
+    """
+    if not PARQUET_AVAILABLE:
+        raise ImportError("pyarrow is required to read the Arrow IPC output")
+    path = current_arrow_file(arrow_file)
+    if path is None:
+        raise FileNotFoundError(f"No Arrow output at {arrow_file}")
+    if not as_pandas:
+        return pa.ipc.open_file(pa.memory_map(str(path), 'r')).read_all()
+    with pa.memory_map(str(path), 'r') as source:
+        return pa.ipc.open_file(source).read_all().to_pandas()
+
+def output_artifacts(output_file):
+    """Paths write_outputs writes for output_file: CSV, and with pyarrow parquet, dataset and Arrow."""
+    artifacts = {'csv': Path(output_file)}
     if PARQUET_AVAILABLE:
         output_dir = Path('output')
-        output_dir.mkdir(exist_ok=True)
-        parquet_file = output_dir / f"{Path(output_file).stem}.parquet"
-        df_final.to_parquet(parquet_file, index=False)
-        print(f"Generated {output_file}")
-        print(f"Generated {parquet_file}")
+        artifacts['parquet'] = output_dir / f"{Path(output_file).stem}.parquet"
+        artifacts['dataset'] = output_dir / f"{Path(output_file).stem}_dataset"
+        artifacts['arrow'] = output_dir / f"{Path(output_file).stem}.arrow"
+    return artifacts
+
+def outputs_exist(output_file):
+    """True if every artifact of a run writing output_file is still on disk."""
+    artifacts = output_artifacts(output_file)
+    if 'arrow' in artifacts and current_arrow_file(artifacts.pop('arrow')) is None:
+        return False
+    return all(path.exists() for path in artifacts.values())
+
+def write_outputs(df_final, output_file, sep=';', encoding='utf-8-sig', sort_output=True):
+    """Write the programme table as CSV plus a parquet copy in output/."""
+    # Sort by kavakood for consistent output
+    if sort_output and 'kavakood' in df_final.columns:
+        df_final = df_final.sort_values('kavakood')
+    
+    Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+    df_final.to_csv(output_file, index=False, encoding=encoding, sep=sep)
+    
+    # Save parquet version to output folder
+    if PARQUET_AVAILABLE:
+        artifacts = output_artifacts(output_file)
+        parquet_file = artifacts['parquet']
+        parquet_file.parent.mkdir(exist_ok=True)
+        # Categoricals become dictionary-encoded columns
+        df_final.to_parquet(parquet_file, index=False, use_dictionary=True)
+        dataset_dir = write_partitioned_dataset(df_final, artifacts['dataset'])
+        arrow_file = write_arrow_file(df_final, artifacts['arrow'])
+        print(f"Output saved to: {output_file}")
+        print(f"Parquet saved to: {parquet_file}")
+        print(f"Partitioned dataset saved to: {dataset_dir}")
+        print(f"Arrow IPC saved to: {arrow_file}")
     else:
-        print(f"Generated {output_file}")
+        print(f"Output saved to: {output_file}")
         print("Note: Install pyarrow for parquet format support")
-    print(f"Processed {len(df_final)} records")
+    print(f"Total programmes: {len(df_final)}")
     return df_final
 
+_source_hashes = {}
+
+def source_hash(path):
+    """Hash of a source file, read once per process."""
+    path = Path(path)
+    if path not in _source_hashes:
+        _source_hashes[path] = hashlib.sha1(path.read_bytes()).hexdigest()[:16]
+    return _source_hashes[path]
+
+def pipeline_code_hash():
+    """Hash of this module's source: the read, reduce and typing code of the memoized stages."""
+    return source_hash(__file__)
+
+def rules_code_hash():
+    """Hash of faculty_rules.py; only the map stage depends on it."""
+    return source_hash(faculty_rules.__file__)
+
+def code_fingerprint(*parts):
+    """Hash plain values into a short cache key; code changes enter through the source hashes."""
+    digest = hashlib.sha1()
+    for part in parts:
+        if not isinstance(part, str):
+            part = json.dumps(part, ensure_ascii=False, sort_keys=True, default=str)
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\x1f')
+    return digest.hexdigest()[:16]
+
+def file_identity(path):
+    """Cheap identity of an input file: resolved path, size and modification time."""
+    stat = Path(path).stat()
+    return [str(Path(path).resolve()), stat.st_size, stat.st_mtime_ns]
+
+class StageRunner:
+    """Runs pipeline stages, timing each one and memoizing outputs keyed by their inputs.
+    
+    Memoized artifacts are pickles in output/cache/stages/, one file per stage and key;
+    only the newest few per stage are kept.
+    """
+    
+    KEEP_ARTIFACTS = 3
+    
+    def __init__(self, cache_dir=STAGE_CACHE_DIR, use_cache=True):
+        self.cache_dir = Path(cache_dir)
+        self.use_cache = use_cache
+        self.timings = []
+    
+    def _artifact(self, name, key):
+        return self.cache_dir / f"{name}-{key}.pkl"
+    
+    def cached(self, name, key):
+        """Return the memoized output of a stage, or None if there is none."""
+        artifact = self._artifact(name, key)
+        if not self.use_cache or not artifact.exists():
+            return None
+        started = time.perf_counter()
+        try:
+            result = pd.read_pickle(artifact)
+        except Exception as e:
+            print(f"Ignoring unreadable {name} cache ({e})")
+            return None
+        self.timings.append({'stage': name, 'seconds': round(time.perf_counter() - started, 4), 'cached': True})
+        return result
+    
+    def store(self, name, key, result):
+        """Memoize a stage output and prune older artifacts of the same stage."""
+        if not self.use_cache:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        artifact = self._artifact(name, key)
+        tmp = artifact.with_suffix('.tmp')
+        pd.to_pickle(result, tmp)
+        os.replace(tmp, artifact)
+        
+        older = sorted(self.cache_dir.glob(f"{name}-*.pkl"), key=lambda f: f.stat().st_mtime, reverse=True)
+        for stale in older[self.KEEP_ARTIFACTS:]:
+            stale.unlink(missing_ok=True)
+    
+    def call(self, name, func, *args, **kwargs):
+        """Hook around the actual stage call; subclasses can wrap it (e.g. profiling)."""
+        return func(*args, **kwargs)
+    
+    def run(self, name, func, *args, key=None, **kwargs):
+        """Run one stage, reusing its memoized output when a key is given and known."""
+        if key is not None:
+            result = self.cached(name, key)
+            if result is not None:
+                return result
+        
+        started = time.perf_counter()
+        result = self.call(name, func, *args, **kwargs)
+        self.timings.append({'stage': name, 'seconds': round(time.perf_counter() - started, 4), 'cached': False})
+        
+        if key is not None:
+            self.store(name, key, result)
+        return result
+    
+    def report(self):
+        """Print the time spent per stage."""
+        print("Stage timings:")
+        for timing in self.timings:
+            note = ' (cached)' if timing['cached'] else ''
+            print(f"  {timing['stage']:<10} {timing['seconds']:>9.4f}s{note}")
+
+def count_rows(value):
+    """Row count of a stage input or output: frames, maps, decoded text or the first of a tuple."""
+    if isinstance(value, dict) or hasattr(value, 'shape'):
+        return len(value)
+    if isinstance(value, str):
+        # Decoded export text counts its lines; short strings (paths) are not rows
+        return value.count('\n') or None
+    if isinstance(value, (tuple, list)) and value:
+        return count_rows(value[0])
+    return None
+
+class ProfilingStageRunner(StageRunner):
+    """StageRunner that runs every stage under cProfile and records wall/CPU time and row counts.
+    
+    write_report() dumps one .prof file for the whole run (open it with pstats or snakeviz)
+    and a JSON summary per stage next to it in output/profiles/.
+    """
+    
+    def __init__(self, profile_dir=PROFILE_DIR, **kwargs):
+        super().__init__(**kwargs)
+        self.profile_dir = Path(profile_dir)
+        self.profiler = cProfile.Profile()
+        self.stage_stats = []
+        self.started_at = datetime.now()
+    
+    def call(self, name, func, *args, **kwargs):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        self.profiler.enable()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            self.profiler.disable()
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        
+        rows_in = next((rows for rows in map(count_rows, args) if rows is not None), None)
+        rows_out = count_rows(result)
+        busiest = max(rows_in or 0, rows_out or 0)
+        self.stage_stats.append({
+            'stage': name,
+            'wall_seconds': round(wall, 4),
+            'cpu_seconds': round(cpu, 4),
+            'rows_in': rows_in,
+            'rows_out': rows_out,
+            'rows_per_second': round(busiest / wall) if busiest and wall > 0 else None
+        })
+        return result
+    
+    def write_report(self, top=20):
+        """Write the cProfile stats and the per-stage JSON; returns both paths."""
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        stem = f"run-{self.started_at:%Y%m%d-%H%M%S}"
+        prof_file = self.profile_dir / f"{stem}.prof"
+        json_file = self.profile_dir / f"{stem}.json"
+        self.profiler.dump_stats(prof_file)
+        
+        # Hot spots by cumulative time, for a quick look without opening the .prof
+        import pstats
+        stats = pstats.Stats(str(prof_file))
+        hot_spots = []
+        for (filename, line, function), (calls, _, own, cumulative, _) in sorted(
+                stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:top]:
+            hot_spots.append({'function': f"{Path(filename).name}:{line}({function})", 'calls': calls,
+                              'own_seconds': round(own, 4), 'cumulative_seconds': round(cumulative, 4)})
+        
+        report = {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'stages': self.stage_stats,
+            'cached_stages': [t['stage'] for t in self.timings if t['cached']],
+            'total_wall_seconds': round(sum(s['wall_seconds'] for s in self.stage_stats), 4),
+            'total_cpu_seconds': round(sum(s['cpu_seconds'] for s in self.stage_stats), 4),
+            'hot_spots': hot_spots
+        }
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        
+        print(f"Profile saved to: {prof_file}")
+        print(f"Stage report saved to: {json_file}")
+        return prof_file, json_file
+
+def hash_reduced_rows(df_grouped, column_mapping):
+    """One 64-bit content hash per programme of the reduced export, indexed by kavakood.
+    
+    Only the columns that feed the output are hashed, so unrelated export columns
+    (or whether they were parsed at all) do not count as changes.
+    """
+    kava_col = column_mapping['TalTechi õppekava kood']
+    hashes = pd.util.hash_pandas_object(df_grouped[list(output_source_columns(column_mapping).values())],
+                                        index=False)
+    hashes.index = df_grouped[kava_col].astype(str)
+    return hashes
+
+def diff_reduced_rows(old_hashes, new_hashes):
+    """Compare two row-hash snapshots; returns (added, changed, removed) kavakood indexes."""
+    added = new_hashes.index.difference(old_hashes.index)
+    removed = old_hashes.index.difference(new_hashes.index)
+    common = new_hashes.index.intersection(old_hashes.index)
+    changed = common[new_hashes.loc[common].to_numpy() != old_hashes.loc[common].to_numpy()]
+    return added, changed, removed
+
+def load_incremental_state(state_path=INCREMENTAL_STATE_FILE):
+    """Return the stored row hashes and output of the previous run, or None."""
+    try:
+        return pd.read_pickle(state_path)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Ignoring unreadable incremental state ({e})")
+        return None
+
+def save_incremental_state(state, state_path=INCREMENTAL_STATE_FILE):
+    """Store row hashes and output for the next incremental run."""
+    state_path = Path(state_path)
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = state_path.with_suffix('.tmp')
+    pd.to_pickle(state, tmp)
+    os.replace(tmp, state_path)
+
+def type_and_map(df_grouped, column_mapping, programme_school_map):
+    """Steps 5-7.5 for a set of reduced rows: type the output columns and add teaduskond."""
+    df_final = type_programmes(df_grouped, column_mapping)
+    if 'kavakood' in df_final.columns:
+        df_final = assign_teaduskond(df_final, programme_school_map)
+    return df_final
+
+def update_incremental(df_grouped, column_mapping, programme_school_map, stages,
+                       state_path=INCREMENTAL_STATE_FILE):
+    """Re-type and re-map only programmes added or changed since the previous run.
+    
+    The previous output is kept with the row hashes of the reduced export it came from;
+    unchanged programmes are taken from it, removed ones dropped. Any change to the column
+    layout, the scraped programmes or the pipeline code forces a full rebuild.
+    """
+    kava_col = column_mapping['TalTechi õppekava kood']
+    state_key = code_fingerprint(output_source_columns(column_mapping), programme_school_map,
+                                 pipeline_code_hash(), rules_code_hash())
+    new_hashes = stages.run('hash', hash_reduced_rows, df_grouped, column_mapping)
+    state = load_incremental_state(state_path)
+    
+    if state is None or state['key'] != state_key or not new_hashes.index.is_unique:
+        print("Incremental: no usable previous run, processing all programmes")
+        df_final = stages.run('type+map', type_and_map, df_grouped, column_mapping, programme_school_map)
+    else:
+        added, changed, removed = diff_reduced_rows(state['hashes'], new_hashes)
+        unchanged = len(new_hashes) - len(added) - len(changed)
+        print(f"Incremental: {len(added)} added, {len(changed)} changed, {len(removed)} removed, "
+              f"{unchanged} unchanged programmes")
+        
+        previous = state['output']
+        kept = previous[~previous['kavakood'].isin(removed.union(changed))]
+        todo = added.union(changed)
+        if len(todo):
+            rows = df_grouped[df_grouped[kava_col].astype(str).isin(todo)]
+            updated = stages.run('type+map', type_and_map, rows, column_mapping, programme_school_map)
+            merged = pd.concat([kept, updated], ignore_index=True)
+            merged = merged.astype(previous.dtypes.to_dict())
+        else:
+            merged = kept
+        
+        # Same row order as a full rebuild: the order of the reduced export
+        order = pd.Series(range(len(new_hashes)), index=new_hashes.index)
+        df_final = merged.iloc[order.loc[merged['kavakood']].to_numpy().argsort()].reset_index(drop=True)
+    
+    save_incremental_state({'key': state_key, 'hashes': new_hashes, 'output': df_final}, state_path)
+    return df_final
+
+def reduce_export(csv_path, stages, chunksize=None, engine='pandas'):
+    """Read, resolve and reduce one export; skipped entirely when the reduced frame is memoized.
+    
+    Returns (df_grouped, column_mapping, reduce_key), or None if required columns are missing.
+    All engines give the same reduced frame, so they share the memoized result.
+    """
+    reduce_key = code_fingerprint(file_identity(csv_path), pipeline_code_hash())
+    reduced = stages.cached('reduce', reduce_key)
+    if reduced is None:
+        if chunksize:
+            if engine != 'pandas':
+                print(f"--chunksize streams with pandas, ignoring engine {engine}")
+            # In chunked mode only the header is read here, rows are streamed while reducing
+            header, read_info = stages.run('read', read_export_header, csv_path)
+            column_mapping = read_info['column_mapping']
+            if column_mapping is None:
+                return None
+            reduced = stages.run('reduce', reduce_latest_versions_chunked, csv_path,
+                                 read_info['encoding'], column_mapping, chunksize)
+        else:
+            text, read_info = stages.run('read', read_export_text, csv_path)
+            df, column_mapping = stages.run('resolve', parse_export, text, engine)
+            if column_mapping is None:
+                return None
+            reducer = {'pandas': reduce_latest_versions,
+                       'pyarrow': reduce_latest_versions_arrow,
+                       'polars': reduce_latest_versions_polars}[engine]
+            reduced = stages.run('reduce', reducer, df, column_mapping)
+        reduced = (reduced, column_mapping)
+        stages.store('reduce', reduce_key, reduced)
+    df_grouped, column_mapping = reduced
+    return df_grouped, column_mapping, reduce_key
+
+def run_etl(programme_school_map, csv_path=None, input_folder=INPUT_FOLDER, output_file=OUTPUT_FILE,
+            chunksize=None, output_sep=';', output_encoding='utf-8-sig', sort_output=True,
+            stages=None, use_cache=True, incremental=False, memory_report=False, engine='pandas',
+            skip_unchanged=False):
+    """Run the CSV pipeline: discover → read → resolve schema → reduce versions → type → map faculty → write.
+    
+    Every stage is timed; reduce, type and map outputs are memoized so a re-run only
+    recomputes stages whose inputs (file, code or programme map) changed. With
+    incremental=True only programmes that differ from the previous run are typed and mapped.
+    With skip_unchanged=True the whole run is skipped if the export, the programme map, the
+    output settings and the code are the same as in the last run and all its outputs are
+    still there (never with incremental or memory_report, which need a real run).
+    """
+    stages = stages or StageRunner(use_cache=use_cache)
+    
+    # Step 1: Find newest CSV file (equivalent to sorted rows by date created)
+    newest_csv = csv_path or stages.run('discover', find_newest_csv, input_folder)
+    print(f"Processing file: {newest_csv}")
+    
+    run_key = code_fingerprint(file_identity(newest_csv), programme_map_hash(programme_school_map),
+                               str(Path(output_file).resolve()), output_sep, output_encoding, sort_output,
+                               pipeline_code_hash(), rules_code_hash())
+    # Incremental state and memory reports only come from a real run
+    can_skip = skip_unchanged and stages.use_cache and not incremental and not memory_report
+    if can_skip and outputs_exist(output_file) and load_last_run() == run_key:
+        print(f"Export and programme map unchanged since the last run, keeping {output_file}")
+        stages.report()
+        return pd.read_csv(output_file, sep=output_sep, encoding=output_encoding, dtype={'kavakood': str})
+    
+    # Steps 2-4: read, resolve and reduce
+    reduced = reduce_export(newest_csv, stages, chunksize, resolve_engine(engine))
+    if reduced is None:
+        return None
+    df_grouped, column_mapping, reduce_key = reduced
+    
+    if incremental:
+        # Steps 5-7.5 only for programmes added or changed since the previous run
+        df_final = update_incremental(df_grouped, column_mapping, programme_school_map, stages)
+    else:
+        # Steps 5-7: select, rename and type the output columns
+        type_key = code_fingerprint(reduce_key, 'type')
+        df_final = stages.run('type', type_programmes, df_grouped, column_mapping, key=type_key)
+        
+        # Step 7.5: Add teaduskond mapping
+        if 'kavakood' in df_final.columns:
+            map_key = code_fingerprint(type_key, programme_school_map, rules_code_hash())
+            df_final = stages.run('map', assign_teaduskond, df_final.copy(), programme_school_map, key=map_key)
+    
+    # Compact dtypes for the written table (the incremental state keeps the plain frame)
+    compact = stages.run('compact', compact_programmes, df_final)
+    if memory_report:
+        report_memory(df_final, compact)
+    df_final = compact
+    
+    # Step 8: Save to CSV (and parquet)
+    df_final = stages.run('write', write_outputs, df_final, output_file, output_sep, output_encoding, sort_output)
+    save_last_run(run_key)
+    
+    stages.report()
+    return df_final
+
+def load_last_run(last_run_path=LAST_RUN_FILE):
+    """Key of the inputs of the last completed run, or None."""
+    try:
+        with open(last_run_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('run_key')
+    except (FileNotFoundError, ValueError):
+        return None
+
+def save_last_run(run_key, last_run_path=LAST_RUN_FILE):
+    """Remember the inputs of a completed run."""
+    write_json_atomic(last_run_path, {'run_key': run_key,
+                                      'finished_at': datetime.now().isoformat(timespec='seconds')})
+
+def export_date(csv_path):
+    """Date of an export: a YYYY-MM-DD or YYYYMMDD date in the file name, else its creation date."""
+    match = EXPORT_DATE_PATTERN.search(Path(csv_path).stem)
+    if match:
+        try:
+            return datetime(*map(int, match.groups())).strftime('%Y-%m-%d')
+        except ValueError:
+            pass
+    return datetime.fromtimestamp(Path(csv_path).stat().st_ctime).strftime('%Y-%m-%d')
+
+def history_schema():
+    """The one Arrow schema every file of the history dataset is written with.
+    
+    Index widths of categoricals and integer columns otherwise follow each export's own
+    values, and files with different widths cannot be read back as one dataset.
+    """
+    category = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ('snapshot', pa.string()), ('kavakood', pa.string()), ('nimetusek', pa.string()),
+        ('nimetusik', pa.string()), ('tase', category),
+        ('maht', pa.type_for_alias(COMPACT_INT_DTYPES['maht'])),
+        ('nominaalne_oppeaeg', pa.type_for_alias(COMPACT_INT_DTYPES['nominaalne_oppeaeg'])),
+        ('programmijuht', category), ('peakeel', category), ('oppevaldkond', category),
+        ('teaduskond', category), ('teaduskond_allikas', category)
+    ])
+
+def conform_table(df, schema):
+    """Convert a frame to an Arrow table with exactly the given schema; missing columns become nulls."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    columns = [table.column(field.name).cast(field.type) if field.name in table.column_names
+               else pa.nulls(len(table), field.type) for field in schema]
+    return pa.Table.from_arrays(columns, schema=schema)
+
+def process_export(csv_path, programme_school_map, dataset_dir=HISTORY_DATASET_DIR, chunksize=None,
+                   engine='pandas'):
+    """Batch worker: process one export into its own file of the history dataset.
+    
+    Never raises; returns a result dict with 'ok' and either the row count or the error.
+    """
+    csv_path = Path(csv_path)
+    started = time.perf_counter()
+    log = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(log):
+            reduced = reduce_export(csv_path, StageRunner(use_cache=False), chunksize, engine)
+            if reduced is None:
+                raise ValueError("required columns missing")
+            df_grouped, column_mapping, _ = reduced
+            df_final = compact_programmes(type_and_map(df_grouped, column_mapping, programme_school_map))
+        
+        snapshot_date = export_date(csv_path)
+        df_final.insert(0, 'snapshot', csv_path.stem)
+        
+        # Hive-style partition directory; the export_date column comes from the path
+        part_dir = Path(dataset_dir) / f"export_date={snapshot_date}"
+        part_dir.mkdir(parents=True, exist_ok=True)
+        part_file = part_dir / f"{csv_path.stem}.parquet"
+        tmp = part_file.with_suffix('.tmp')
+        pq.write_table(conform_table(df_final, history_schema()), tmp, use_dictionary=True)
+        os.replace(tmp, part_file)
+        
+        return {'file': csv_path.name, 'ok': True, 'export_date': snapshot_date, 'rows': len(df_final),
+                'seconds': round(time.perf_counter() - started, 3)}
+    except Exception as e:
+        return {'file': csv_path.name, 'ok': False, 'error': f"{type(e).__name__}: {e}",
+                'seconds': round(time.perf_counter() - started, 3)}
+
+def process_all_exports(programme_school_map, input_folder=INPUT_FOLDER, dataset_dir=HISTORY_DATASET_DIR,
+                        workers=None, chunksize=None, engine='pandas'):
+    """Process every export in the folder in a process pool into one partitioned Parquet dataset.
+    
+    Files are independent: a file that fails is reported and the rest of the batch continues.
+    """
+    if not PARQUET_AVAILABLE:
+        print("Batch mode writes Parquet, install pyarrow first")
+        return None
+    
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    
+    files = scan_exports(input_folder)[0]['files']
+    csv_files = [Path(input_folder) / name for name in sorted(files, key=lambda name: files[name]['ctime'])]
+    if not csv_files:
+        raise FileNotFoundError(f"No CSV files found in {input_folder}")
+    
+    workers = workers or os.cpu_count() or 1
+    print(f"Processing {len(csv_files)} exports with {min(workers, len(csv_files))} workers...")
+    started = time.perf_counter()
+    
+    # New layouts are cached here, once; workers only read the cache, since concurrent
+    # replaces fail on Windows while another worker has the file open
+    for csv_file in csv_files:
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                read_export_header(csv_file)
+        except Exception:
+            pass  # reported by the worker that processes it
+    
+    results = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(csv_files)),
+                             initializer=disable_schema_cache_writes) as pool:
+        futures = [pool.submit(process_export, csv_file, programme_school_map, dataset_dir, chunksize,
+                               resolve_engine(engine))
+                   for csv_file in csv_files]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result['ok']:
+                print(f"  {result['file']}: {result['rows']} programmes ({result['export_date']}, "
+                      f"{result['seconds']}s)")
+            else:
+                print(f"  {result['file']}: FAILED {result['error']}")
+    
+    failed = [r for r in results if not r['ok']]
+    elapsed = time.perf_counter() - started
+    print(f"Batch done in {elapsed:.2f}s: {len(results) - len(failed)} exports written to {dataset_dir}, "
+          f"{len(failed)} failed")
+    return results
+
+def process_taltechkoikkavad(replay_path=None, chunksize=None, use_cache=True, incremental=False,
+                             memory_report=False, stages=None, engine='pandas', **scrape_options):
+    """Replicate Power Query ETL steps to generate taltechkoikkavad.csv."""
+    stages = stages or StageRunner(use_cache=use_cache)
+    
+    # NEW: Scrape study programmes and schools (or replay a saved snapshot)
+    if replay_path:
+        programme_school_map = stages.run('scrape', replay_snapshot, replay_path)
+    else:
+        print("Scraping study programmes from TalTech timetable...")
+        programme_school_map = stages.run('scrape', scrape_programmes, **scrape_options)
+        if programme_school_map:
+            save_programme_map(programme_school_map)
+        else:
+            # A failed scrape should not turn every faculty into a guess
+            saved_map = load_saved_programme_map()
+            if saved_map:
+                warnings.warn(f"Scraping failed, using the last good {PROGRAMMES_FILE}.")
+                programme_school_map = saved_map
+    
+    return run_etl(programme_school_map, chunksize=chunksize, stages=stages, incremental=incremental,
+                   memory_report=memory_report, engine=engine, output_sep=',', output_encoding='utf-8',
+                   sort_output=False, skip_unchanged=True)
+
+class ExportEventHandler:
+    """Collects filesystem events for export CSVs; the watch loop decides when a file is done.
+    
+    Observers only call dispatch(), so this works without subclassing watchdog's handler
+    (and without importing watchdog until --watch is used).
+    """
+    
+    def __init__(self):
+        self.pending = {}
+        self.changed = threading.Condition()
+    
+    def dispatch(self, event):
+        if event.is_directory:
+            return
+        # Moves cover OneDrive and editors that write a temp file and rename it into place
+        path = Path(getattr(event, 'dest_path', '') or event.src_path)
+        if event.event_type not in ('created', 'modified', 'moved', 'closed'):
+            return
+        if path.suffix.lower() != '.csv' or path.name.startswith(('~$', '.~')):
+            return
+        with self.changed:
+            self.pending[path] = time.monotonic()
+            self.changed.notify()
+    
+    def next_due(self, debounce):
+        """Block until some file has been quiet for `debounce` seconds, then return it."""
+        with self.changed:
+            while True:
+                now = time.monotonic()
+                due = [(seen, path) for path, seen in self.pending.items() if now - seen >= debounce]
+                if due:
+                    _, path = min(due)
+                    del self.pending[path]
+                    return path
+                wait = min(self.pending.values()) + debounce - now if self.pending else debounce
+                # Bounded waits keep Ctrl+C responsive on Windows, where lock waits ignore it
+                self.changed.wait(min(wait, 1.0))
+
+def export_settled(path):
+    """True if the file can be opened and read to its end, i.e. no sync client still holds it."""
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            return f.tell() > 0
+    except OSError:
+        return False
+
+def watch_exports(input_folder=INPUT_FOLDER, debounce=WATCH_DEBOUNCE_SECONDS, replay_path=None,
+                  scrape_options=None, max_age=PROGRAMME_MAX_AGE_HOURS, **etl_options):
+    """Run the CSV pipeline once for every export that lands in the folder.
+    
+    Driven by filesystem events (inotify, ReadDirectoryChangesW, FSEvents via watchdog), not
+    by polling. A file is processed after `debounce` seconds without events, and only once
+    per (size, modification time).
+    """
+    if not WATCHDOG_AVAILABLE:
+        print("Watch mode needs watchdog (pip install watchdog)")
+        return None
+    from watchdog.observers import Observer
+    
+    handler = ExportEventHandler()
+    observer = Observer()
+    observer.schedule(handler, str(input_folder), recursive=False)
+    observer.start()
+    print(f"Watching {input_folder} for new exports (Ctrl+C to stop)...")
+    
+    processed = set()
+    waits = {}
+    try:
+        while True:
+            path = handler.next_due(debounce)
+            if not path.exists():
+                continue
+            
+            # Still locked or empty: check again after another quiet period
+            if not export_settled(path):
+                waits[path] = waits.get(path, 0) + 1
+                if waits[path] < WATCH_MAX_WAITS:
+                    with handler.changed:
+                        handler.pending.setdefault(path, time.monotonic())
+                else:
+                    print(f"Giving up on {path.name}, it never became readable")
+                continue
+            waits.pop(path, None)
+            
+            stat = path.stat()
+            identity = (path, stat.st_size, stat.st_mtime_ns)
+            if identity in processed:
+                continue
+            processed.add(identity)
+            
+            print(f"New export: {path.name}")
+            try:
+                programme_map = load_programme_map(replay_path, scrape_options, max_age)
+                run_etl(programme_map, csv_path=path, **etl_options)
+            except Exception as e:
+                # One bad export must not stop the watcher
+                print(f"Processing {path.name} failed: {e}")
+    except KeyboardInterrupt:
+        print("Stopped watching")
+    finally:
+        observer.stop()
+        observer.join()
+
+def load_saved_programme_map(programmes_file=PROGRAMMES_FILE):
+    """The last good scraped map, or None if there is none."""
+    try:
+        with open(programmes_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def programme_map_age(programmes_file=PROGRAMMES_FILE, manifest_path=PROGRAMME_MANIFEST_FILE):
+    """Seconds since the saved map was last confirmed by a scrape."""
+    checked_at = load_programme_manifest(manifest_path).get('checked_at')
+    if checked_at:
+        return time.time() - datetime.fromisoformat(checked_at).timestamp()
+    # Saved before snapshots existed: the file's own age
+    return time.time() - Path(programmes_file).stat().st_mtime
+
+def refresh_programme_map(scrape_options=None, quiet=True):
+    """Scrape and save the map; returns it, or None (with a warning) if the scrape or save failed."""
+    try:
+        programme_map = scrape_programmes(quiet=quiet, **(scrape_options or {}))
+        if programme_map:
+            save_programme_map(programme_map)
+    except Exception as e:
+        print(f"Error refreshing programme map: {e}")
+        programme_map = None
+    if not programme_map:
+        warnings.warn(f"Refreshing the programme map failed, {PROGRAMMES_FILE} stays as it was.")
+        return None
+    return programme_map
+
+_programme_refresh = None
+
+def refresh_programme_map_in_background(scrape_options=None):
+    """Start one background refresh unless one is already running; returns its thread."""
+    global _programme_refresh
+    if _programme_refresh is None or not _programme_refresh.is_alive():
+        # Not a daemon thread: the interpreter waits for the refreshed map to be saved
+        _programme_refresh = threading.Thread(target=refresh_programme_map, args=(scrape_options,),
+                                              name='programme-refresh')
+        _programme_refresh.start()
+    return _programme_refresh
+
+def load_programme_map(replay_path=None, scrape_options=None, max_age=PROGRAMME_MAX_AGE_HOURS):
+    """Programme map for CSV-only runs: a replayed snapshot, the saved JSON, or a fresh scrape.
+    
+    A saved map older than max_age hours is still used for this run while a fresh one is
+    scraped in the background for the next (max_age=None: never refresh).
+    """
+    if replay_path:
+        print("Replaying saved page snapshot...")
+        return replay_snapshot(replay_path, quiet=True)
+    
+    print("Loading previously scraped programmes...")
+    
+    # Try to load scraped programmes
+    programme_map = load_saved_programme_map()
+    if programme_map is None:
+        print("No scraped programmes found. Running scraping first...")
+        return refresh_programme_map(scrape_options) or {}
+    
+    print(f"Loaded {len(programme_map)} scraped programmes")
+    age_hours = programme_map_age() / 3600
+    if max_age is not None and age_hours > max_age:
+        print(f"Scraped programmes are {age_hours:.1f}h old (max {max_age:g}h), refreshing in the background")
+        refresh_programme_map_in_background(scrape_options)
+    return programme_map
+
+def parse_address(value):
+    """Parse a HOST:PORT string into a socket address tuple."""
+    host, _, port = value.rpartition(':')
+    return (host or SCRAPER_DAEMON_ADDRESS[0], int(port))
+
 def main():
     """CLI interface for the ETL script using command-line arguments."""
     import sys
@@ -467,13 +2138,52 @@ def main():
                       help='Scraping only (save programmes to file)')
     group.add_argument('--csvetlonly', action='store_true',
                       help='CSV processing only (without scraping)')
+    group.add_argument('--watch', action='store_true',
+                      help='Wait for new exports in the folder and run CSV processing for each one')
+    group.add_argument('--all-exports', action='store_true',
+                      help='Process every export in the folder into a Parquet dataset partitioned by export date')
+    parser.add_argument('--replay', nargs='?', const=str(SNAPSHOT_FILE), metavar='SNAPSHOT',
+                        help='Rebuild programme mapping from a saved page snapshot instead of '
+                             f'starting Edge (default: {SNAPSHOT_FILE})')
+    parser.add_argument('--ready-timeout', type=float, default=READY_TIMEOUT, metavar='SECONDS',
+                        help=f'Deadline for the timetable page to finish rendering (default: {READY_TIMEOUT})')
+    parser.add_argument('--max-age', type=float, default=PROGRAMME_MAX_AGE_HOURS, metavar='HOURS',
+                        help='Refresh saved scraped programmes older than this in the background, using the '
+                             'saved copy for the current run; the process waits for the refresh to finish '
+                             f'before exiting (default: {PROGRAMME_MAX_AGE_HOURS})')
+    parser.add_argument('--chunksize', type=int, nargs='?', const=DEFAULT_CHUNKSIZE, metavar='ROWS',
+                        help='Stream the export in row batches, keeping only the latest version per '
+                             f'programme in memory (default batch: {DEFAULT_CHUNKSIZE})')
+    parser.add_argument('--daemon', nargs='?', const=f'{SCRAPER_DAEMON_ADDRESS[0]}:{SCRAPER_DAEMON_ADDRESS[1]}',
+                        metavar='HOST:PORT',
+                        help='Scrape through a running scraper_daemon.py warm browser session, '
+                             'falling back to a local browser if it is unavailable')
+    parser.add_argument('--engine', choices=ENGINES, default='pandas',
+                        help='Dataframe backend for reading and reducing the export; pyarrow and polars '
+                             'parse on all cores (default: pandas)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Recompute every pipeline stage instead of reusing memoized results')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only type and map programmes added or changed since the previous run')
+    parser.add_argument('--workers', type=int, metavar='N',
+                        help='Worker processes for --all-exports (default: number of CPUs)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Profile every stage with cProfile and write a report to output/profiles/')
+    parser.add_argument('--memory-report', action='store_true',
+                        help='Print bytes per output column before and after dtype compaction')
     
     args = parser.parse_args()
+    scrape_options = {'ready_timeout': args.ready_timeout,
+                      'daemon_address': parse_address(args.daemon) if args.daemon else None}
+    runner = ProfilingStageRunner if args.profile else StageRunner
+    stages = runner(use_cache=not args.no_cache)
     
     try:
         if args.full:
             print("=== Running Full ETL ===")
-            result = process_taltechkoikkavad()
+            result = process_taltechkoikkavad(replay_path=args.replay, chunksize=args.chunksize,
+                                              incremental=args.incremental, memory_report=args.memory_report,
+                                              stages=stages, engine=args.engine, **scrape_options)
             if result is not None:
                 print("Full ETL completed successfully")
             else:
@@ -481,279 +2191,59 @@ def main():
                 
         elif args.scrapeonly:
             print("=== Scraping Only ===")
-            programme_map = scrape_study_programmes()
+            if args.replay:
+                programme_map = stages.run('scrape', replay_snapshot, args.replay)
+            else:
+                programme_map = stages.run('scrape', scrape_programmes, **scrape_options)
             
-            # Save to JSON file for later use
-            import json
-            output_file = "scraped_programmes.json"
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(programme_map, f, ensure_ascii=False, indent=2)
-            print(f"Scraped {len(programme_map)} programmes saved to {output_file}")
+            # Save to JSON file for later use, with a snapshot if anything changed
+            if not programme_map:
+                print(f"No programmes scraped, keeping existing {PROGRAMMES_FILE}")
+                sys.exit(1)
+            snapshot = save_programme_map(programme_map)
+            if snapshot['changed']:
+                print(f"Scraped {len(programme_map)} programmes saved to {PROGRAMMES_FILE}")
             
         elif args.csvetlonly:
             print("=== CSV Processing Only ===")
-            print("Loading previously scraped programmes...")
             
-            # Try to load scraped programmes
-            import json
-            try:
-                with open("scraped_programmes.json", 'r', encoding='utf-8') as f:
-                    programme_map = json.load(f)
-                print(f"Loaded {len(programme_map)} scraped programmes")
-            except FileNotFoundError:
-                print("No scraped programmes found. Running scraping first...")
-                # Set quiet mode for scraping
-                scrape_study_programmes._quiet_mode = True
-                programme_map = scrape_study_programmes()
-                # Save for future use
-                with open("scraped_programmes.json", 'w', encoding='utf-8') as f:
-                    json.dump(programme_map, f, ensure_ascii=False, indent=2)
+            programme_map = stages.run('scrape', load_programme_map, args.replay, scrape_options, args.max_age)
             
             # Run CSV processing with loaded data
-            result = process_csv_with_mapping(programme_map)
+            result = process_csv_with_mapping(programme_map, chunksize=args.chunksize, incremental=args.incremental,
+                                              memory_report=args.memory_report, stages=stages, engine=args.engine)
             if result is not None:
                 print("CSV processing completed successfully")
             else:
                 print("CSV processing failed")
+        
+        elif args.watch:
+            print("=== Watching for New Exports ===")
+            watch_exports(replay_path=args.replay, scrape_options=scrape_options, max_age=args.max_age,
+                          chunksize=args.chunksize, use_cache=not args.no_cache, incremental=args.incremental,
+                          memory_report=args.memory_report, engine=args.engine)
+        
+        elif args.all_exports:
+            print("=== Batch Processing All Exports ===")
+            programme_map = load_programme_map(args.replay, scrape_options, args.max_age)
+            results = process_all_exports(programme_map, workers=args.workers, chunksize=args.chunksize,
+                                          engine=args.engine)
+            if results is None or not any(r['ok'] for r in results):
+                print("Batch processing failed")
+                sys.exit(1)
                 
     except Exception as e:
         print(f"Error: {e}")
         sys.exit(1)
+    finally:
+        if args.profile:
+            stages.write_report()
 
-def process_csv_with_mapping(programme_school_map):
+def process_csv_with_mapping(programme_school_map, chunksize=None, use_cache=True, incremental=False,
+                             memory_report=False, stages=None, engine='pandas'):
     """Process CSV with pre-loaded programme mapping."""
-    # Input and output paths
-    input_folder = r"C:\Users\siyi.ma\OneDrive - Tallinna Tehnikaülikool\OIS\csv\Otsing_oppekavad"
-    output_folder = r"C:\Users\siyi.ma\OneDrive - Tallinna Tehnikaülikool\OIS\pysiandmed"
-    output_file = Path(output_folder) / "taltechkoikkavad.csv"
-    
-    # Ensure output folder exists
-    Path(output_folder).mkdir(parents=True, exist_ok=True)
-    
-    # Step 1: Find newest CSV file
-    newest_csv = find_newest_csv(input_folder)
-    print(f"Processing file: {newest_csv}")
-    
-    # Step 2: Read CSV with specific encoding and delimiter
-    # Try multiple encodings for Baltic characters
-    encodings = ['utf-8-sig', 'windows-1257', 'iso-8859-4', 'utf-8', 'cp1252']
-    df = None
-    
-    for encoding in encodings:
-        try:
-            df = pd.read_csv(newest_csv, 
-                           delimiter=';', 
-                           encoding=encoding,
-                           header=1,  # Skip first row, use second row as header
-                           skipinitialspace=True)
-            print(f"Successfully read with encoding: {encoding}")
-            break
-        except (UnicodeDecodeError, pd.errors.EmptyDataError):
-            continue
-    
-    if df is None:
-        raise ValueError("Could not read CSV with any supported encoding")
-    
-    # Handle BOM and clean column names
-    df.columns = df.columns.str.strip().str.replace('\ufeff', '')
-    
-    # Drop any columns with blank/NaN/BOM-only names
-    df = df.loc[:, ~df.columns.isin(['', ' ', '\ufeff']) & df.columns.notna()]
-    
-    # Map expected columns to actual columns (handle variations)
-    column_mapping = {}
-    for col in df.columns:
-        col_lower = col.lower().strip()
-        if 'õppekava kood' in col_lower and 'taltech' in col_lower:
-            column_mapping['TalTechi õppekava kood'] = col
-        elif 'maht' in col_lower and 'eap' in col_lower:
-            column_mapping['maht (EAP)'] = col
-        elif 'õppekavaversiooni kood' in col_lower:
-            column_mapping['õppekavaversiooni kood'] = col
-        elif 'nimetus e.k' in col_lower:
-            column_mapping['nimetus e.k.'] = col
-        elif 'nimetus i.k' in col_lower:
-            column_mapping['nimetus i.k.'] = col
-        elif 'õppetase' in col_lower:
-            column_mapping['õppetase'] = col
-        elif 'nominaalne õppeaeg' in col_lower:
-            column_mapping['nominaalne õppeaeg (semestrites)'] = col
-        elif 'programmijuhi nimi' in col_lower or 'õppekava juhi' in col_lower:
-            column_mapping['õppekava juhi/programmijuhi nimi'] = col
-        elif 'peakeel' in col_lower:
-            column_mapping['peakeel'] = col
-        elif 'õppevaldkond' in col_lower:
-            column_mapping['õppevaldkond'] = col
-    
-    # Check if required columns are found
-    required_columns = ['TalTechi õppekava kood', 'maht (EAP)', 'õppekavaversiooni kood']
-    missing_columns = [col for col in required_columns if col not in column_mapping]
-    
-    if missing_columns:
-        print(f"Missing required columns: {missing_columns}")
-        print("Available columns for manual mapping:")
-        for col in df.columns:
-            print(f"  '{col}'")
-        return None
-    
-    # Step 3: Clean data - remove rows where "maht (EAP)" is empty
-    maht_col = column_mapping['maht (EAP)']
-    df_clean = df[df[maht_col].notna() & (df[maht_col] != '')]
-    
-    # Step 4: Group by full TalTechi õppekava kood, sort by version descending, take first
-    # This ensures we get the latest version of each programme
-    kava_col = column_mapping['TalTechi õppekava kood']
-    version_col = column_mapping['õppekavaversiooni kood']
-    df_sorted = df_clean.sort_values(version_col, ascending=False)
-    df_grouped = df_sorted.groupby(kava_col).first().reset_index()
-    
-    # Step 5: Select and rename columns using mapped column names
-    output_columns = {
-        'kavakood': column_mapping.get('TalTechi õppekava kood'),
-        'nimetusek': column_mapping.get('nimetus e.k.'),
-        'nimetusik': column_mapping.get('nimetus i.k.'),
-        'tase': column_mapping.get('õppetase'),
-        'maht': column_mapping.get('maht (EAP)'),
-        'nominaalne_oppeaeg': column_mapping.get('nominaalne õppeaeg (semestrites)'),
-        'programmijuht': column_mapping.get('õppekava juhi/programmijuhi nimi'),
-        'peakeel': column_mapping.get('peakeel'),
-        'oppevaldkond': column_mapping.get('õppevaldkond')
-    }
-    
-    # Filter out columns that weren't found
-    available_columns = {k: v for k, v in output_columns.items() if v is not None}
-    
-    # Select available columns and rename
-    df_final = df_grouped[list(available_columns.values())].copy()
-    df_final.columns = list(available_columns.keys())
-    
-    # Step 7: Transform data types and uppercase "tase"
-    if 'kavakood' in df_final.columns:
-        df_final['kavakood'] = df_final['kavakood'].astype(str)
-    if 'nimetusek' in df_final.columns:
-        df_final['nimetusek'] = df_final['nimetusek'].astype(str)
-    if 'nimetusik' in df_final.columns:
-        df_final['nimetusik'] = df_final['nimetusik'].astype(str)
-    if 'tase' in df_final.columns:
-        df_final['tase'] = df_final['tase'].astype(str).str.upper()
-    if 'maht' in df_final.columns:
-        # Handle European decimal format (comma) and convert to numeric
-        df_final['maht'] = df_final['maht'].astype(str).str.replace(',', '.', regex=False)
-        df_final['maht'] = pd.to_numeric(df_final['maht'], errors='coerce')
-        df_final['maht'] = df_final['maht'].fillna(0).astype(int)
-    if 'nominaalne_oppeaeg' in df_final.columns:
-        df_final['nominaalne_oppeaeg'] = pd.to_numeric(df_final['nominaalne_oppeaeg'], errors='coerce')
-        df_final['nominaalne_oppeaeg'] = df_final['nominaalne_oppeaeg'].fillna(0).astype(int)
-    if 'programmijuht' in df_final.columns:
-        df_final['programmijuht'] = df_final['programmijuht'].astype(str)
-    if 'peakeel' in df_final.columns:
-        df_final['peakeel'] = df_final['peakeel'].astype(str)
-    if 'oppevaldkond' in df_final.columns:
-        df_final['oppevaldkond'] = df_final['oppevaldkond'].astype(str)
-    
-    # Step 7.5: Add teaduskond mapping using provided mapping
-    if 'kavakood' in df_final.columns:
-        # Create a lookup dictionary from full_code to school
-        code_to_school = {}
-        for full_code, info in programme_school_map.items():
-            school = info['school']
-            code_to_school[full_code] = school
-        
-        # First pass: direct mapping from scraped data
-        df_final['teaduskond'] = df_final['kavakood'].map(
-            lambda x: code_to_school.get(x, 'Teaduskond määramata')
-        )
-        
-        # Add mapping source column
-        df_final['teaduskond_allikas'] = df_final['kavakood'].map(
-            lambda x: 'Scraped' if x in code_to_school else 'Unmapped'
-        )
-        
-        mapped_count = sum(df_final['teaduskond'] != 'Teaduskond määramata')
-        unmapped_count = sum(df_final['teaduskond'] == 'Teaduskond määramata')
-        print(f"Mapped {mapped_count} programmes to schools (from {len(programme_school_map)} scraped programmes)")
-        print(f"Unmapped programmes: {unmapped_count}")
-        
-        # Debug: Show which programmes were mapped
-        mapped_programmes = df_final[df_final['teaduskond_allikas'] == 'Scraped']['kavakood'].tolist()
-        print(f"Scraped programmes found in CSV: {len(mapped_programmes)}")
-        if len(mapped_programmes) < len(programme_school_map):
-            scraped_codes = set(programme_school_map.keys())
-            csv_codes = set(df_final['kavakood'].tolist())
-            missing_in_csv = scraped_codes - csv_codes
-            print(f"Scraped codes not found in CSV ({len(missing_in_csv)}): {sorted(missing_in_csv)}")
-        
-        # Apply educated guessing for unmapped programmes
-        if unmapped_count > 0:
-            print("Making educated guesses for unmapped programmes based on study fields...")
-            
-            def guess_teaduskond(row):
-                if row['teaduskond'] != 'Teaduskond määramata':
-                    return row['teaduskond'], row['teaduskond_allikas']
-                
-                # Get study field for guessing
-                oppevaldkond = str(row.get('oppevaldkond', '')).lower() if 'oppevaldkond' in row else ''
-                
-                # Educated guessing based on study field patterns
-                if any(word in oppevaldkond for word in ['informaatika', 'infotehnoloogia', 'arvutiteadus', 'küberturve', 'it']):
-                    return 'INFOTEHNOLOOGIA TEADUSKOND', 'Guessed'
-                elif any(word in oppevaldkond for word in ['ehitus', 'arhitektuur', 'insener', 'tehnika', 'tehnoloogia', 'energia', 'elektro', 'masina', 'material']):
-                    return 'INSENERITEADUSKOND', 'Guessed'
-                elif any(word in oppevaldkond for word in ['loodus', 'füüsika', 'matemaatika', 'keemia', 'bio', 'geo', 'öko']):
-                    return 'LOODUSTEADUSKOND', 'Guessed'
-                elif any(word in oppevaldkond for word in ['majandus', 'äri', 'juht', 'õigus', 'avalik', 'poliitika', 'sotsiaal']):
-                    return 'MAJANDUSTEADUSKOND', 'Guessed'
-                elif any(word in oppevaldkond for word in ['mere', 'laev', 'vesi', 'sadama']):
-                    return 'EESTI MEREAKADEEMIA', 'Guessed'
-                else:
-                    # Look at programme code patterns as last resort
-                    kavakood = str(row.get('kavakood', ''))
-                    if kavakood.startswith(('I', 'V')):  # Common IT/CS prefixes
-                        return 'INFOTEHNOLOOGIA TEADUSKOND', 'Guessed'
-                    elif kavakood.startswith(('E', 'M', 'R')):  # Common engineering prefixes
-                        return 'INSENERITEADUSKOND', 'Guessed'
-                    elif kavakood.startswith(('L', 'Y', 'K')):  # Common natural sciences prefixes
-                        return 'LOODUSTEADUSKOND', 'Guessed'
-                    elif kavakood.startswith(('T', 'H')):  # Common business/social prefixes
-                        return 'MAJANDUSTEADUSKOND', 'Guessed'
-                    elif kavakood.startswith('V') and 'meer' in oppevaldkond:  # Marine
-                        return 'EESTI MEREAKADEEMIA', 'Guessed'
-                    else:
-                        return 'Teaduskond määramata', 'Unmapped'
-            
-            # Apply guessing function
-            guessed_results = df_final.apply(guess_teaduskond, axis=1, result_type='expand')
-            df_final['teaduskond'] = guessed_results[0]
-            df_final['teaduskond_allikas'] = guessed_results[1]
-            
-            # Count final results
-            final_mapped = sum(df_final['teaduskond_allikas'] == 'Scraped')
-            final_guessed = sum(df_final['teaduskond_allikas'] == 'Guessed')
-            final_unmapped = sum(df_final['teaduskond_allikas'] == 'Unmapped')
-            
-            print(f"Final mapping: {final_mapped} scraped, {final_guessed} guessed, {final_unmapped} unmapped")
-    
-    # Step 8: Save to CSV with Excel-compatible format
-    # Sort by kavakood for consistent output
-    if 'kavakood' in df_final.columns:
-        df_final = df_final.sort_values('kavakood')
-    
-    df_final.to_csv(output_file, index=False, encoding='utf-8-sig', sep=';')
-    
-    # Save parquet version to output folder
-    if PARQUET_AVAILABLE:
-        output_dir = Path('output')
-        output_dir.mkdir(exist_ok=True)
-        parquet_file = output_dir / f"{Path(output_file).stem}.parquet"
-        df_final.to_parquet(parquet_file, index=False)
-        print(f"Output saved to: {output_file}")
-        print(f"Parquet saved to: {parquet_file}")
-    else:
-        print(f"Output saved to: {output_file}")
-        print("Note: Install pyarrow for parquet format support")
-    print(f"Total programmes: {len(df_final)}")
-    
-    return df_final
+    return run_etl(programme_school_map, chunksize=chunksize, use_cache=use_cache, incremental=incremental,
+                   memory_report=memory_report, stages=stages, engine=engine, skip_unchanged=True)
 
 if __name__ == "__main__":
     try:
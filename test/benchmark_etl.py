@@ -0,0 +1,184 @@
+"""Synthetic-scale benchmark for the CSV ETL pipeline.
+
+Generates realistic Otsing_oppekavad exports (two-row header with the real
+Estonian column names, ';' delimiter, comma decimals, windows-1257), runs
+run_etl on each size and times every stage. Results are compared against
+benchmark_baseline.json; a stage that got slower than the tolerance allows
+is reported as a regression and the script exits with status 1.
+
+Usage:
+    python test/benchmark_etl.py                          # 1k, 10k, 100k rows
+    python test/benchmark_etl.py --sizes 1000 1000000 --repeat 3
+    python test/benchmark_etl.py --engine pyarrow
+    python test/benchmark_etl.py --update-baseline
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from taltechkoikkavad import ENGINES, StageRunner, run_etl
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+BASELINE_FILE = Path(__file__).resolve().parent / "benchmark_baseline.json"
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+DEFAULT_TOLERANCE = 0.3
+# Stages faster than this are too noisy to compare
+MIN_COMPARED_SECONDS = 0.1
+
+EXPORT_TITLE = "Otsing õppekavad"
+EXPORT_COLUMNS = [
+    'TalTechi õppekava kood', 'õppekavaversiooni kood', 'nimetus e.k.', 'nimetus i.k.', 'õppetase',
+    'maht (EAP)', 'nominaalne õppeaeg (semestrites)', 'õppekava juhi/programmijuhi nimi', 'peakeel',
+    'õppevaldkond', 'õppekava staatus', 'kinnitamise kuupäev'
+]
+LEVELS = {'B': 'bakalaureuseõpe', 'M': 'magistriõpe', 'D': 'doktoriõpe', 'R': 'rakenduskõrgharidusõpe'}
+CREDITS = {'B': '180,00', 'M': '120,00', 'D': '240,00', 'R': '240,00'}
+SEMESTERS = {'B': '6', 'M': '4', 'D': '8', 'R': '8'}
+FIELDS = ['informaatika', 'ehitus ja tsiviilrajatised', 'füüsikaline loodusteadus', 'majandus ja haldus',
+          'meresõit', 'kunstid', 'keemia', 'õigus', 'tehnika, tootmine ja ehitus', 'ärindus ja haldus', '']
+NAMES = ['Informaatika', 'Ärijuhtimine', 'Laevajuhtimine', 'Keemia- ja materjalitehnoloogia', 'Õigusteadus',
+         'Küberturvalisus', 'Hoonete ehitus', 'Tööstustehnika ja juhtimine', 'Rakendusfüüsika']
+MANAGERS = ['Mari Maasikas', 'Jüri Õun', 'Tõnu Kägu', 'Ülle Šmidt', 'Žanna Põder', '']
+
+
+def generate_export(path, rows, seed=1):
+    """Write a synthetic export of `rows` version rows.
+
+    Programme codes include the scraped ones, so faculty mapping sees both direct
+    hits and guesses; each programme has several versions and some rows lack maht.
+    """
+    rng = random.Random(seed)
+    with open(REPO_DIR / "scraped_programmes.json", "r", encoding="utf-8") as f:
+        codes = list(json.load(f))
+    letters = 'ABCDEFGHIJKLMNOPRSTUV'
+    while len(codes) < max(rows // 6, 100):
+        codes.append(''.join(rng.choice(letters) for _ in range(3)) + rng.choice('BMDR') +
+                     f"{rng.randint(0, 99):02d}")
+
+    with open(path, 'w', encoding='windows-1257', newline='') as f:
+        f.write(EXPORT_TITLE + ';' * (len(EXPORT_COLUMNS) - 1) + '\r\n')
+        f.write(';'.join(EXPORT_COLUMNS) + '\r\n')
+        for i in range(rows):
+            code = rng.choice(codes)
+            level = code[3] if code[3] in LEVELS else 'B'
+            version = f"{code}/{rng.randint(10, 25):02d}{i:07d}"
+            maht = CREDITS[level] if rng.random() > 0.03 else ''
+            f.write(';'.join([
+                code, version, f"{rng.choice(NAMES)} {i % 11}", f"Programme {i % 7}", LEVELS[level], maht,
+                SEMESTERS[level] if rng.random() > 0.05 else '', rng.choice(MANAGERS),
+                rng.choice(['eesti', 'inglise']), rng.choice(FIELDS), 'kehtiv',
+                f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.20{rng.randint(10, 25)}"
+            ]) + '\r\n')
+    return path
+
+
+def benchmark_size(rows, workdir, repeat=1, chunksize=None, engine='pandas'):
+    """Run the pipeline on a fresh export of `rows` rows; best time per stage over `repeat` runs."""
+    with open(REPO_DIR / "scraped_programmes.json", "r", encoding="utf-8") as f:
+        programme_school_map = json.load(f)
+
+    size_dir = Path(workdir) / str(rows)
+    size_dir.mkdir(parents=True, exist_ok=True)
+    csv_path = generate_export(size_dir / "Otsing_oppekavad.csv", rows)
+
+    best = {}
+    output_rows = None
+    cwd = os.getcwd()
+    os.chdir(size_dir)
+    try:
+        for _ in range(repeat):
+            stages = StageRunner(use_cache=False)
+            with contextlib.redirect_stdout(io.StringIO()):
+                df_final = run_etl(programme_school_map, csv_path=csv_path, chunksize=chunksize, engine=engine,
+                                   output_file=size_dir / "taltechkoikkavad.csv", stages=stages)
+            output_rows = len(df_final)
+            for timing in stages.timings:
+                stage = timing['stage']
+                best[stage] = min(best.get(stage, float('inf')), timing['seconds'])
+    finally:
+        os.chdir(cwd)
+
+    best['total'] = round(sum(best.values()), 4)
+    return {'rows': rows, 'programmes': output_rows, 'stages': best}
+
+
+def compare_with_baseline(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Return a list of regression messages for stages slower than baseline * (1 + tolerance)."""
+    regressions = []
+    for rows, result in results.items():
+        reference = baseline.get(str(rows))
+        if reference is None:
+            continue
+        if reference['programmes'] != result['programmes']:
+            regressions.append(f"{rows} rows: {result['programmes']} programmes, baseline "
+                               f"{reference['programmes']}")
+        for stage, seconds in result['stages'].items():
+            expected = reference['stages'].get(stage)
+            if expected is None or max(seconds, expected) < MIN_COMPARED_SECONDS:
+                continue
+            if seconds > expected * (1 + tolerance):
+                regressions.append(f"{rows} rows, {stage}: {seconds:.4f}s vs baseline {expected:.4f}s "
+                                   f"(+{(seconds / expected - 1) * 100:.0f}%)")
+    return regressions
+
+
+def print_results(results, baseline):
+    print(f"{'rows':>9}  {'stage':<10} {'seconds':>9} {'baseline':>9}")
+    for rows, result in results.items():
+        reference = baseline.get(str(rows), {}).get('stages', {})
+        for stage, seconds in result['stages'].items():
+            expected = reference.get(stage)
+            expected = f"{expected:.4f}" if expected is not None else '-'
+            print(f"{rows:>9,}  {stage:<10} {seconds:>9.4f} {expected:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the ETL pipeline on synthetic exports')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, metavar='ROWS',
+                        help=f'Export sizes in rows (default: {" ".join(map(str, DEFAULT_SIZES))})')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per size, best time is kept')
+    parser.add_argument('--chunksize', type=int, default=None, help='Benchmark the chunked reader')
+    parser.add_argument('--engine', choices=ENGINES, default='pandas', help='Dataframe backend to benchmark')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f'Allowed slowdown per stage (default: {DEFAULT_TOLERANCE})')
+    parser.add_argument('--baseline', default=str(BASELINE_FILE), help='Baseline JSON file')
+    parser.add_argument('--update-baseline', action='store_true', help='Store these results as the baseline')
+    args = parser.parse_args()
+
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text(encoding='utf-8')) if baseline_path.exists() else {}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = {}
+        for rows in args.sizes:
+            print(f"Benchmarking {rows:,} rows...")
+            results[rows] = benchmark_size(rows, workdir, args.repeat, args.chunksize, args.engine)
+
+    print_results(results, baseline)
+
+    if args.update_baseline:
+        baseline.update({str(rows): result for rows, result in results.items()})
+        baseline_path.write_text(json.dumps(baseline, indent=2), encoding='utf-8')
+        print(f"Baseline updated: {baseline_path}")
+        return
+
+    regressions = compare_with_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print("Performance regressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
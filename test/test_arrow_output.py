@@ -0,0 +1,30 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from taltechkoikkavad import ARROW_KEEP_VERSIONS, current_arrow_file, load_programmes_arrow, write_arrow_file
+
+def test_new_versions_never_replace_a_mapped_file(tmp_path):
+    """A reader's mapped table stays valid and untouched while later runs write new versions."""
+    arrow_file = tmp_path / 'taltechkoikkavad.arrow'
+    df = pd.DataFrame({'kavakood': ['IACB17', 'EAKB23'], 'maht': [180.0, 240.0]})
+    
+    first = write_arrow_file(df, arrow_file)
+    mapped = load_programmes_arrow(arrow_file, as_pandas=False)
+    
+    versions = [first]
+    for extra in range(1, ARROW_KEEP_VERSIONS + 2):
+        versions.append(write_arrow_file(df.assign(maht=df['maht'] + extra), arrow_file))
+    
+    assert len(set(versions)) == len(versions)
+    assert current_arrow_file(arrow_file) == versions[-1]
+    assert sorted(tmp_path.glob('taltechkoikkavad-*.arrow')) == sorted(versions[-ARROW_KEEP_VERSIONS:])
+    assert load_programmes_arrow(arrow_file)['maht'].tolist() == [180.0 + len(versions) - 1,
+                                                                   240.0 + len(versions) - 1]
+    assert mapped.column('maht').to_pylist() == [180.0, 240.0]
+    
+    # Same content again reuses its version
+    assert write_arrow_file(df.assign(maht=df['maht'] + len(versions) - 1), arrow_file) == versions[-1]
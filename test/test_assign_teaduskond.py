@@ -0,0 +1,86 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from taltechkoikkavad import UNMAPPED_SCHOOL, assign_teaduskond
+
+PROGRAMME_SCHOOL_MAP = {
+    'IACB17': {'full_code': 'IACB17', 'programme_name': 'Informaatika', 'school': 'INFOTEHNOLOOGIA TEADUSKOND'},
+    'TAAB16': {'full_code': 'TAAB16', 'programme_name': 'Ärindus', 'school': 'MAJANDUSTEADUSKOND'},
+}
+
+# kavakood, oppevaldkond, expected teaduskond, expected teaduskond_allikas
+CASES = [
+    # Scraped codes win over any guess
+    ('IACB17', 'keemia', 'INFOTEHNOLOOGIA TEADUSKOND', 'Scraped'),
+    ('TAAB16', None, 'MAJANDUSTEADUSKOND', 'Scraped'),
+    # Study field keywords, first rule wins
+    ('ZXCB01', 'Informaatika', 'INFOTEHNOLOOGIA TEADUSKOND', 'Guessed'),
+    ('ZXCB02', 'elektroenergeetika', 'INSENERITEADUSKOND', 'Guessed'),
+    ('ZXCB07', 'ehitus ja tsiviilrajatised', 'INFOTEHNOLOOGIA TEADUSKOND', 'Guessed'),  # 'it' in 'ehitus'
+    ('ZXCB03', 'füüsikaline loodusteadus', 'LOODUSTEADUSKOND', 'Guessed'),
+    ('ZXCB04', 'ärindus ja haldus', 'MAJANDUSTEADUSKOND', 'Guessed'),
+    ('ZXCB05', 'laevandus', 'EESTI MEREAKADEEMIA', 'Guessed'),
+    ('ZXCB06', 'meresõit', 'INFOTEHNOLOOGIA TEADUSKOND', 'Guessed'),  # 'it' is checked before 'mere'
+    # Code prefixes when no field keyword matches
+    ('EAAB17', 'kunstid', 'INSENERITEADUSKOND', 'Guessed'),
+    ('KAKB02', '', 'LOODUSTEADUSKOND', 'Guessed'),
+    ('HAAB02', None, 'MAJANDUSTEADUSKOND', 'Guessed'),
+    # The old 'V' + 'meer' marine rule came after the 'V' prefix rule and never fired
+    ('VAMB01', 'meerkeel', 'INFOTEHNOLOOGIA TEADUSKOND', 'Guessed'),
+    # Nothing matches
+    ('ZAAB01', 'kunstid', UNMAPPED_SCHOOL, 'Unmapped'),
+    ('AAVM02', None, UNMAPPED_SCHOOL, 'Unmapped'),
+]
+
+def reference_teaduskond(kavakood, oppevaldkond, programme_school_map):
+    """The row-wise rules assign_teaduskond replaced, including the unreachable marine rule."""
+    if kavakood in programme_school_map:
+        return programme_school_map[kavakood]['school'], 'Scraped'
+    oppevaldkond = str(oppevaldkond).lower()
+    if any(word in oppevaldkond for word in ['informaatika', 'infotehnoloogia', 'arvutiteadus', 'küberturve', 'it']):
+        return 'INFOTEHNOLOOGIA TEADUSKOND', 'Guessed'
+    elif any(word in oppevaldkond for word in ['ehitus', 'arhitektuur', 'insener', 'tehnika', 'tehnoloogia',
+                                               'energia', 'elektro', 'masina', 'material']):
+        return 'INSENERITEADUSKOND', 'Guessed'
+    elif any(word in oppevaldkond for word in ['loodus', 'füüsika', 'matemaatika', 'keemia', 'bio', 'geo', 'öko']):
+        return 'LOODUSTEADUSKOND', 'Guessed'
+    elif any(word in oppevaldkond for word in ['majandus', 'äri', 'juht', 'õigus', 'avalik', 'poliitika',
+                                               'sotsiaal']):
+        return 'MAJANDUSTEADUSKOND', 'Guessed'
+    elif any(word in oppevaldkond for word in ['mere', 'laev', 'vesi', 'sadama']):
+        return 'EESTI MEREAKADEEMIA', 'Guessed'
+    elif kavakood.startswith(('I', 'V')):
+        return 'INFOTEHNOLOOGIA TEADUSKOND', 'Guessed'
+    elif kavakood.startswith(('E', 'M', 'R')):
+        return 'INSENERITEADUSKOND', 'Guessed'
+    elif kavakood.startswith(('L', 'Y', 'K')):
+        return 'LOODUSTEADUSKOND', 'Guessed'
+    elif kavakood.startswith(('T', 'H')):
+        return 'MAJANDUSTEADUSKOND', 'Guessed'
+    elif kavakood.startswith('V') and 'meer' in oppevaldkond:
+        return 'EESTI MEREAKADEEMIA', 'Guessed'
+    return UNMAPPED_SCHOOL, 'Unmapped'
+
+def test_assign_teaduskond_cases():
+    df = pd.DataFrame([case[:2] for case in CASES], columns=['kavakood', 'oppevaldkond'])
+    
+    result = assign_teaduskond(df, PROGRAMME_SCHOOL_MAP)
+    
+    expected = [case[2:] for case in CASES]
+    assert list(zip(result['teaduskond'], result['teaduskond_allikas'])) == expected
+    assert expected == [reference_teaduskond(code, field, PROGRAMME_SCHOOL_MAP) for code, field, *_ in CASES]
+
+def test_assign_teaduskond_without_study_field_column():
+    """Exports without oppevaldkond fall back to code prefixes only."""
+    codes = ['IACB17', 'ZXCB01', 'EAAB17', 'VAMB01', 'ZAAB01']
+    df = pd.DataFrame({'kavakood': codes})
+    
+    result = assign_teaduskond(df, PROGRAMME_SCHOOL_MAP)
+    
+    assert list(zip(result['teaduskond'], result['teaduskond_allikas'])) == [
+        reference_teaduskond(code, '', PROGRAMME_SCHOOL_MAP) for code in codes]
+    assert list(result['teaduskond_allikas']) == ['Scraped', 'Unmapped', 'Guessed', 'Guessed', 'Unmapped']
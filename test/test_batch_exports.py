@@ -0,0 +1,52 @@
+import json
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from benchmark_etl import generate_export
+from taltechkoikkavad import SCHEMA_CACHE_FILE, process_all_exports
+
+def test_batch_workers_do_not_write_schema_cache(tmp_path, monkeypatch):
+    """The parent caches the layout once; workers only read it, so none of them can fail on a replace."""
+    monkeypatch.chdir(tmp_path)
+    exports = tmp_path / 'exports'
+    exports.mkdir()
+    with open(Path(__file__).resolve().parent.parent / "scraped_programmes.json", "r", encoding="utf-8") as f:
+        programme_school_map = json.load(f)
+    for seed, name in enumerate(['Otsing_oppekavad_2024-09-01.csv', 'Otsing_oppekavad_2025-09-01.csv'], 1):
+        generate_export(exports / name, 300, seed=seed)
+    
+    results = process_all_exports(programme_school_map, exports, tmp_path / 'history', workers=2)
+    
+    assert [result['ok'] for result in results] == [True, True]
+    cache = json.loads(SCHEMA_CACHE_FILE.read_text(encoding='utf-8'))
+    assert len(cache['layouts']) == 1
+    # Typed-read dtypes are only recorded by single-file runs, never by a worker
+    assert [layout['dtypes'] for layout in cache['layouts'].values()] == [None]
+
+def test_history_dataset_reads_back_across_value_ranges(tmp_path, monkeypatch):
+    """Exports whose values fit different integer widths still form one readable dataset."""
+    monkeypatch.chdir(tmp_path)
+    exports = tmp_path / 'exports'
+    exports.mkdir()
+    with open(Path(__file__).resolve().parent.parent / "scraped_programmes.json", "r", encoding="utf-8") as f:
+        programme_school_map = json.load(f)
+    early = generate_export(exports / 'Otsing_oppekavad_2024-09-01.csv', 300, seed=1)
+    generate_export(exports / 'Otsing_oppekavad_2025-09-01.csv', 300, seed=2)
+    
+    # Every maht of the earlier export fits int8
+    text = early.read_text(encoding='windows-1257')
+    early.write_text(text.replace('180,00', '120,00').replace('240,00', '120,00'), encoding='windows-1257')
+    
+    results = process_all_exports(programme_school_map, exports, tmp_path / 'history', workers=2)
+    assert [result['ok'] for result in results] == [True, True]
+    
+    history = pd.read_parquet(tmp_path / 'history')
+    assert len(history) == sum(result['rows'] for result in results)
+    assert sorted(history.loc[history['export_date'] == '2024-09-01', 'maht'].unique()) in ([0, 120], [120])
+    assert 180 in set(history.loc[history['export_date'] == '2025-09-01', 'maht'])
+    assert ds.dataset(tmp_path / 'history', partitioning='hive').to_table().num_rows == len(history)
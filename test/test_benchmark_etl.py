@@ -0,0 +1,23 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from benchmark_etl import benchmark_size, compare_with_baseline
+
+def test_benchmark_times_every_stage(tmp_path):
+    """A small synthetic export runs through every pipeline stage."""
+    result = benchmark_size(1000, tmp_path)
+    
+    assert result['programmes'] > 0
+    assert set(result['stages']) >= {'read', 'resolve', 'reduce', 'type', 'map', 'write', 'total'}
+    
+    assert not compare_with_baseline({1000: result}, {'1000': result})
+
+def test_slower_stage_is_a_regression():
+    current = {1000: {'programmes': 10, 'stages': {'reduce': 2.0, 'write': 0.05}}}
+    baseline = {'1000': {'programmes': 10, 'stages': {'reduce': 1.0, 'write': 0.01}}}
+    
+    # write is below the noise floor, only reduce counts
+    regressions = compare_with_baseline(current, baseline)
+    assert len(regressions) == 1 and 'reduce' in regressions[0]
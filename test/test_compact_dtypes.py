@@ -0,0 +1,18 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from taltechkoikkavad import compact_programmes
+
+def test_count_dtypes_do_not_depend_on_values():
+    """Small and large counts compact to the same dtypes, so written schemas match across runs."""
+    small = compact_programmes(pd.DataFrame({'kavakood': ['IACB17'], 'maht': [120], 'nominaalne_oppeaeg': [4]}))
+    large = compact_programmes(pd.DataFrame({'kavakood': ['IACB17'], 'maht': [480], 'nominaalne_oppeaeg': [12]}))
+    
+    assert small.dtypes.to_dict() == large.dtypes.to_dict()
+    assert str(large['maht'].dtype) == 'int16'
+    assert str(large['nominaalne_oppeaeg'].dtype) == 'int8'
+    assert large['maht'].tolist() == [480]
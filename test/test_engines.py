@@ -0,0 +1,54 @@
+import contextlib
+import io
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from benchmark_etl import EXPORT_COLUMNS, EXPORT_TITLE, REPO_DIR, generate_export
+from taltechkoikkavad import StageRunner, run_etl
+
+def test_engines_and_chunked_reader_write_identical_output(tmp_path, monkeypatch):
+    """pandas, pyarrow, polars and --chunksize give byte-identical CSV on the same export."""
+    monkeypatch.chdir(tmp_path)
+    with open(REPO_DIR / "scraped_programmes.json", "r", encoding="utf-8") as f:
+        programme_school_map = json.load(f)
+    # Blank maht values, missing semesters and empty study fields are part of the generated data
+    csv_path = generate_export(tmp_path / "Otsing_oppekavad.csv", 3000)
+    
+    outputs = {}
+    for name, options in [('pandas', {}), ('pyarrow', {'engine': 'pyarrow'}), ('polars', {'engine': 'polars'}),
+                          ('chunked', {'chunksize': 700})]:
+        output_file = tmp_path / f"{name}.csv"
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_etl(programme_school_map, csv_path=csv_path, output_file=output_file,
+                    stages=StageRunner(cache_dir=tmp_path / name, use_cache=False), **options)
+        outputs[name] = output_file.read_bytes()
+    
+    assert outputs['pandas'].count(b'\n') > 100
+    for name in ('pyarrow', 'polars', 'chunked'):
+        assert outputs[name] == outputs['pandas'], f"{name} output differs from pandas"
+
+def test_chunked_reader_handles_text_version_after_the_sample(tmp_path, monkeypatch):
+    """Numeric versions for the first 1199 rows and a text one after them read like the full file."""
+    monkeypatch.chdir(tmp_path)
+    codes = ['IACB17', 'IVSM17', 'EAKB23', 'LAAB20']
+    lines = [EXPORT_TITLE + ';' * (len(EXPORT_COLUMNS) - 1), ';'.join(EXPORT_COLUMNS)]
+    for i in range(1, 1201):
+        version = str(i) if i < 1200 else 'IACB17/1200'
+        code = codes[i % len(codes)] if i < 1200 else 'IACB17'
+        lines.append(';'.join([code, version, f"Programme {i}", 'Programme', 'bakalaureuseõpe', '180,00', '6',
+                               'Mari Maasikas', 'eesti', 'informaatika', 'kehtiv', '01.09.2017']))
+    csv_path = tmp_path / "Otsing_oppekavad.csv"
+    csv_path.write_text('\r\n'.join(lines) + '\r\n', encoding='windows-1257')
+    
+    outputs = {}
+    for name, options in [('pandas', {}), ('chunked', {'chunksize': 500})]:
+        output_file = tmp_path / f"{name}.csv"
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_etl({}, csv_path=csv_path, output_file=output_file,
+                    stages=StageRunner(cache_dir=tmp_path / name, use_cache=False), **options)
+        outputs[name] = output_file.read_bytes()
+    
+    assert outputs['chunked'] == outputs['pandas']
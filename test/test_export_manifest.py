@@ -0,0 +1,42 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from taltechkoikkavad import find_newest_csv, load_export_manifest, scan_exports
+
+def test_scan_reports_only_new_or_changed_exports(tmp_path):
+    folder = tmp_path / 'exports'
+    folder.mkdir()
+    manifest_path = tmp_path / 'manifest.json'
+    (folder / 'Otsing_oppekavad_2024.csv').write_bytes(b'2024;export\r\n')
+    (folder / 'notes.txt').write_bytes(b'not an export')
+    
+    entry, new_files = scan_exports(folder, manifest_path)
+    assert new_files == [folder / 'Otsing_oppekavad_2024.csv']
+    assert list(entry['files']) == ['Otsing_oppekavad_2024.csv']
+    assert entry['files']['Otsing_oppekavad_2024.csv']['hash'] is None
+    
+    assert scan_exports(folder, manifest_path)[1] == []
+    
+    (folder / 'Otsing_oppekavad_2025.csv').write_bytes(b'2025;export\r\n')
+    assert scan_exports(folder, manifest_path)[1] == [folder / 'Otsing_oppekavad_2025.csv']
+    
+    # Content changes are reported; once hashed, a touch without new content is not
+    with open(folder / 'Otsing_oppekavad_2025.csv', 'ab') as f:
+        f.write(b'more;rows\r\n')
+    assert scan_exports(folder, manifest_path)[1] == [folder / 'Otsing_oppekavad_2025.csv']
+    stat = (folder / 'Otsing_oppekavad_2025.csv').stat()
+    os.utime(folder / 'Otsing_oppekavad_2025.csv', ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert scan_exports(folder, manifest_path)[1] == []
+    
+    stored = load_export_manifest(manifest_path)['folders'][str(folder.resolve())]
+    assert stored['newest'] == 'Otsing_oppekavad_2025.csv'
+    assert find_newest_csv(folder, manifest_path) == folder / 'Otsing_oppekavad_2025.csv'
+
+def test_find_newest_csv_without_exports(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        find_newest_csv(tmp_path, tmp_path / 'manifest.json')
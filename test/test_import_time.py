@@ -0,0 +1,39 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+# Importing the module must stay cheap; heavy dependencies load on first use
+IMPORT_BUDGET_MS = 250
+DEFERRED_MODULES = ('pandas', 'numpy', 'pyarrow', 'selenium')
+
+def import_in_subprocess():
+    """Import taltechkoikkavad in a fresh interpreter; return (milliseconds, heavy modules loaded)."""
+    code = (
+        "import json, sys, time\n"
+        "started = time.perf_counter()\n"
+        "import taltechkoikkavad\n"
+        "elapsed = (time.perf_counter() - started) * 1000\n"
+        f"loaded = [name for name in {DEFERRED_MODULES!r} if name in sys.modules]\n"
+        "print(json.dumps({'ms': elapsed, 'loaded': loaded}))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], cwd=REPO_DIR, capture_output=True, text=True,
+                            check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    return result['ms'], result['loaded']
+
+def test_heavy_dependencies_are_not_imported():
+    """pandas, numpy, pyarrow and selenium load only in the code paths that use them."""
+    _, loaded = import_in_subprocess()
+    assert loaded == []
+
+def test_import_time_budget():
+    """Best of three cold imports stays within IMPORT_BUDGET_MS."""
+    best = min(import_in_subprocess()[0] for _ in range(3))
+    assert best < IMPORT_BUDGET_MS, f"import took {best:.0f} ms, budget {IMPORT_BUDGET_MS} ms"
+
+if __name__ == "__main__":
+    ms, loaded = import_in_subprocess()
+    print(f"import taltechkoikkavad: {ms:.1f} ms, heavy modules loaded: {loaded or 'none'}")
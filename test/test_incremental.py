@@ -0,0 +1,52 @@
+import json
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from taltechkoikkavad import StageRunner, type_and_map, update_incremental
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+COLUMN_MAPPING = {
+    'TalTechi õppekava kood': 'kood',
+    'nimetus e.k.': 'nimetus',
+    'õppetase': 'tase',
+    'maht (EAP)': 'maht',
+    'õppevaldkond': 'valdkond',
+}
+
+def reduced_export(rows):
+    return pd.DataFrame(rows, columns=['kood', 'nimetus', 'tase', 'maht', 'valdkond'])
+
+def test_incremental_update_matches_full_rebuild(tmp_path):
+    """Re-mapping only the diff gives the same table as processing everything."""
+    with open(REPO_DIR / "scraped_programmes.json", "r", encoding="utf-8") as f:
+        programme_school_map = json.load(f)
+    
+    state_path = tmp_path / 'state.pkl'
+    stages = StageRunner(cache_dir=tmp_path / 'stages', use_cache=False)
+    previous = reduced_export([
+        ['EAKB23', 'Meretehnika', 'bakalaureuseõpe', '180,00', 'meresõit'],
+        ['IACB17', 'Informaatika', 'bakalaureuseõpe', '180,00', 'informaatika'],
+        ['XYZM01', 'Ehitus', 'magistriõpe', '120,00', 'ehitus ja tsiviilrajatised'],
+    ])
+    update_incremental(previous, COLUMN_MAPPING, programme_school_map, stages, state_path)
+    
+    current = reduced_export([
+        ['AAAB01', 'Keemia', 'bakalaureuseõpe', '180,00', 'keemia'],
+        ['EAKB23', 'Meretehnika', 'bakalaureuseõpe', '240,00', 'meresõit'],
+        ['IACB17', 'Informaatika', 'bakalaureuseõpe', '180,00', 'informaatika'],
+    ])
+    incremental = update_incremental(current, COLUMN_MAPPING, programme_school_map, stages, state_path)
+    full = type_and_map(current, COLUMN_MAPPING, programme_school_map)
+    
+    pd.testing.assert_frame_equal(incremental, full)
+
+if __name__ == "__main__":
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        test_incremental_update_matches_full_rebuild(Path(tmp))
+    print("Incremental update matches full rebuild")
@@ -0,0 +1,54 @@
+import sys
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lookup_server import LookupServer, ProgrammeIndex
+
+def test_index_lookups():
+    """Point lookups and prefix/faculty/level filters over the output table."""
+    index = ProgrammeIndex(pd.DataFrame({
+        'kavakood': ['IACB17', 'IACM02', 'IVSM17', 'EAKB23'],
+        'tase': ['BAKALAUREUSEÕPE', 'MAGISTRIÕPE', 'MAGISTRIÕPE', 'BAKALAUREUSEÕPE'],
+        'maht': [180, 120, 120, None],
+        'teaduskond': ['INFOTEHNOLOOGIA TEADUSKOND', 'INFOTEHNOLOOGIA TEADUSKOND',
+                       'INFOTEHNOLOOGIA TEADUSKOND', 'EESTI MEREAKADEEMIA'],
+    }))
+    
+    assert index.get('EAKB23')['maht'] is None
+    assert index.get('iacb17')['kavakood'] == 'IACB17'
+    assert index.get('XXXX00') is None
+    assert [row['kavakood'] for row in index.filter(prefix='IACB')] == ['IACB17']
+    assert [row['kavakood'] for row in index.filter(prefix='ia')] == ['IACB17', 'IACM02']
+    assert [row['kavakood'] for row in index.filter(teaduskond='infotehnoloogia teaduskond',
+                                                    tase='magistriõpe')] == ['IACM02', 'IVSM17']
+    assert index.filter(prefix='IACM02X') == []
+
+def test_reload_needs_post(tmp_path):
+    """GET never changes server state; only POST /reload reloads the index."""
+    source = tmp_path / 'taltechkoikkavad.csv'
+    pd.DataFrame({'kavakood': ['IACB17'], 'teaduskond': ['INFOTEHNOLOOGIA TEADUSKOND']}).to_csv(
+        source, sep=';', index=False, encoding='utf-8-sig')
+    
+    with LookupServer(('127.0.0.1', 0), source, poll_seconds=0) as server:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            with pytest.raises(urllib.error.HTTPError) as error:
+                urllib.request.urlopen(f"{base}/reload")
+            assert error.value.code == 404
+            
+            with urllib.request.urlopen(urllib.request.Request(f"{base}/reload", method='POST')) as response:
+                assert response.status == 200
+        finally:
+            server.shutdown()
+
+if __name__ == "__main__":
+    test_index_lookups()
+    print("Lookup index OK")
@@ -0,0 +1,31 @@
+import contextlib
+import io
+import json
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from benchmark_etl import REPO_DIR, generate_export
+from taltechkoikkavad import DATASET_DIR, OUTPUT_FILE, StageRunner, output_artifacts, run_etl
+
+def test_every_artifact_follows_the_output_name(tmp_path, monkeypatch):
+    """A run with another output file leaves the main run's dataset alone."""
+    monkeypatch.chdir(tmp_path)
+    assert output_artifacts(OUTPUT_FILE)['dataset'] == DATASET_DIR
+    with open(REPO_DIR / "scraped_programmes.json", "r", encoding="utf-8") as f:
+        programme_school_map = json.load(f)
+    
+    results = {}
+    for name, rows in [('taltechkoikkavad', 600), ('ref', 300)]:
+        csv_path = generate_export(tmp_path / f"{name}_export.csv", rows, seed=rows)
+        with contextlib.redirect_stdout(io.StringIO()):
+            results[name] = run_etl(programme_school_map, csv_path=csv_path, output_file=tmp_path / f"{name}.csv",
+                                    stages=StageRunner(use_cache=False))
+    
+    for name, df in results.items():
+        artifacts = output_artifacts(tmp_path / f"{name}.csv")
+        assert artifacts['dataset'] == Path('output') / f"{name}_dataset"
+        assert len(pd.read_parquet(artifacts['dataset'])) == len(df)
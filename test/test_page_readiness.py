@@ -0,0 +1,36 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from taltechkoikkavad import READY_QUIET_MS, VALID_SCHOOLS, PageReadiness
+
+class FakeDriver:
+    """Replays one readiness probe result per poll."""
+    
+    def __init__(self, probes):
+        self.probes = iter(probes)
+    
+    def execute_script(self, script, *args):
+        return next(self.probes)
+
+def probe(programmes, quiet_ms=READY_QUIET_MS, inflight=0, network_idle_ms=READY_QUIET_MS):
+    return {'schools': len(VALID_SCHOOLS), 'programmes': programmes, 'mutations': 1,
+            'quietMs': quiet_ms, 'inflight': inflight, 'networkIdleMs': network_idle_ms}
+
+def signals(probes):
+    driver = FakeDriver(probes)
+    condition = PageReadiness()
+    return [condition(driver) for _ in probes]
+
+def test_long_idle_network_alone_is_not_ready():
+    """A stale resource timestamp does not end the wait while the page is still rendering."""
+    assert signals([probe(10, quiet_ms=0, network_idle_ms=60_000),
+                    probe(25, quiet_ms=0, network_idle_ms=60_000)]) == [False, False]
+
+def test_request_in_flight_waits_for_a_stable_count():
+    """A pending backend call falls back to the slower stable-count signal."""
+    assert signals([probe(240, inflight=1)] * 4) == [False, False, False, 'programme-count-stable']
+
+def test_idle_network_and_settled_page_is_ready():
+    assert signals([probe(240), probe(240)]) == [False, 'network-idle']
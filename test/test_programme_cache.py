@@ -0,0 +1,77 @@
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import taltechkoikkavad
+from taltechkoikkavad import PROGRAMME_MANIFEST_FILE, PROGRAMMES_FILE, load_programme_map, save_programme_map
+
+OLD_MAP = {'IACB17': {'full_code': 'IACB17', 'programme_name': 'Informaatika', 'school': 'INFOTEHNOLOOGIA TEADUSKOND'}}
+NEW_MAP = {'IACB17': {'full_code': 'IACB17', 'programme_name': 'Informaatika', 'school': 'INSENERITEADUSKOND'}}
+
+def age_saved_map(hours):
+    manifest = json.loads(PROGRAMME_MANIFEST_FILE.read_text(encoding='utf-8'))
+    manifest['checked_at'] = (datetime.now() - timedelta(hours=hours)).isoformat(timespec='seconds')
+    PROGRAMME_MANIFEST_FILE.write_text(json.dumps(manifest), encoding='utf-8')
+
+def test_stale_map_is_used_while_refreshing_in_background(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    save_programme_map(OLD_MAP)
+    age_saved_map(48)
+    
+    def slow_scrape(**scrape_options):
+        time.sleep(0.3)
+        return NEW_MAP
+    
+    monkeypatch.setattr(taltechkoikkavad, 'scrape_programmes', slow_scrape)
+    
+    started = time.perf_counter()
+    assert load_programme_map(max_age=24) == OLD_MAP
+    assert time.perf_counter() - started < 0.3
+    
+    taltechkoikkavad._programme_refresh.join()
+    assert json.loads(PROGRAMMES_FILE.read_text(encoding='utf-8')) == NEW_MAP
+    
+    # Just refreshed, so the next run does not scrape
+    monkeypatch.setattr(taltechkoikkavad, 'scrape_programmes', lambda **scrape_options: pytest.fail("scraped"))
+    assert load_programme_map(max_age=24) == NEW_MAP
+
+def test_failed_refresh_keeps_cached_map(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    save_programme_map(OLD_MAP)
+    age_saved_map(48)
+    monkeypatch.setattr(taltechkoikkavad, 'scrape_programmes', lambda **scrape_options: {})
+    
+    with pytest.warns(UserWarning, match="Refreshing the programme map failed"):
+        assert load_programme_map(max_age=24) == OLD_MAP
+        taltechkoikkavad._programme_refresh.join()
+    assert json.loads(PROGRAMMES_FILE.read_text(encoding='utf-8')) == OLD_MAP
+
+def test_refresh_passes_quiet_without_global_state(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = []
+    
+    def scrape(**scrape_options):
+        calls.append(scrape_options)
+        return NEW_MAP
+    
+    monkeypatch.setattr(taltechkoikkavad, 'scrape_programmes', scrape)
+    assert taltechkoikkavad.refresh_programme_map({'ready_timeout': 5}) == NEW_MAP
+    assert calls == [{'quiet': True, 'ready_timeout': 5}]
+    assert not hasattr(taltechkoikkavad.scrape_study_programmes, '_quiet_mode')
+
+def test_failed_save_warns_instead_of_raising(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(taltechkoikkavad, 'scrape_programmes', lambda **scrape_options: NEW_MAP)
+    
+    def broken_save(programme_map):
+        raise OSError("disk full")
+    
+    monkeypatch.setattr(taltechkoikkavad, 'save_programme_map', broken_save)
+    with pytest.warns(UserWarning, match="Refreshing the programme map failed"):
+        assert taltechkoikkavad.refresh_programme_map() is None
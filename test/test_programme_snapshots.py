@@ -0,0 +1,46 @@
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from taltechkoikkavad import load_programme_manifest, programme_map_hash, save_programme_map
+
+def programme(code, school):
+    return {'full_code': code, 'programme_name': f"Programme {code}", 'school': school}
+
+def test_snapshots_record_changes_and_skip_identical_maps(tmp_path):
+    programmes_file = tmp_path / 'scraped_programmes.json'
+    snapshot_dir = tmp_path / 'snapshots'
+    first = {
+        'IACB17': programme('IACB17', 'INFOTEHNOLOOGIA TEADUSKOND'),
+        'KAKB02': programme('KAKB02', 'LOODUSTEADUSKOND'),
+    }
+    
+    entry = save_programme_map(first, programmes_file, snapshot_dir)
+    assert entry['changed'] and entry['diff']['added'] == ['IACB17', 'KAKB02']
+    assert json.loads(programmes_file.read_text(encoding='utf-8')) == first
+    
+    # Same content in another key order: nothing is rewritten
+    written = programmes_file.stat().st_mtime_ns
+    entry = save_programme_map(dict(reversed(list(first.items()))), programmes_file, snapshot_dir)
+    assert not entry['changed']
+    assert programmes_file.stat().st_mtime_ns == written
+    
+    second = {
+        'IACB17': programme('IACB17', 'INSENERITEADUSKOND'),
+        'TAAB16': programme('TAAB16', 'MAJANDUSTEADUSKOND'),
+    }
+    entry = save_programme_map(second, programmes_file, snapshot_dir)
+    assert entry['diff'] == {
+        'added': ['TAAB16'],
+        'removed': ['KAKB02'],
+        'reassigned': [{'full_code': 'IACB17', 'from': 'INFOTEHNOLOOGIA TEADUSKOND', 'to': 'INSENERITEADUSKOND'}]
+    }
+    
+    manifest = load_programme_manifest(snapshot_dir / 'manifest.json')
+    assert manifest['current'] == programme_map_hash(second)
+    assert [snapshot['hash'] for snapshot in manifest['snapshots']] == [programme_map_hash(first),
+                                                                       programme_map_hash(second)]
+    for snapshot in manifest['snapshots']:
+        assert (snapshot_dir / snapshot['file']).exists()
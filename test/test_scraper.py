@@ -1,71 +1,38 @@
-import pandas as pd
-import os
-import re
+import json
+import sys
 from pathlib import Path
-from selenium import webdriver
-from selenium.webdriver.edge.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, WebDriverException
-import time
-import warnings
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from taltechkoikkavad import load_snapshot_entries, replay_snapshot, save_snapshot
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+def load_scraped_programmes():
+    with open(REPO_DIR / "scraped_programmes.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def test_replay_saved_page_text():
+    """The saved page text replays to exactly the committed scrape result."""
+    assert replay_snapshot(REPO_DIR / "full_page_text.txt", quiet=True) == load_scraped_programmes()
+
+def test_snapshot_round_trip(tmp_path):
+    """Entries saved as a gzip snapshot replay to the same map, and link entries stay skipped."""
+    entries = load_snapshot_entries(REPO_DIR / "full_page_text.txt")
+    entries.append(("Linked programme (ZZZZ99):", True))
+    snapshot = save_snapshot(entries, snapshot_path=tmp_path / "snapshot.json.gz")
+    
+    assert load_snapshot_entries(snapshot) == entries
+    assert replay_snapshot(snapshot, quiet=True) == load_scraped_programmes()
 
 def simple_scrape_test():
     """Simple test of scraping logic."""
     
     # Test with the saved text file
-    if os.path.exists("full_page_text.txt"):
+    page_text = REPO_DIR / "full_page_text.txt"
+    if page_text.exists():
         print("Using saved page text for testing...")
-        with open("full_page_text.txt", "r", encoding="utf-8") as f:
-            body_text = f.read()
-        
-        lines = body_text.split('\n')
-        
-        valid_schools = [
-            "EESTI MEREAKADEEMIA",
-            "INFOTEHNOLOOGIA TEADUSKOND", 
-            "INSENERITEADUSKOND",
-            "LOODUSTEADUSKOND",
-            "MAJANDUSTEADUSKOND"
-        ]
-        
-        programme_school_map = {}
-        current_school = "Teaduskond määramata"
-        
-        for i, line in enumerate(lines):
-            line = line.strip()
-            
-            if not line:
-                continue
-                
-            # Check for school names
-            if line in valid_schools:
-                current_school = line
-                print(f"Found school at line {i}: {current_school}")
-                continue
-            
-            # Check for programme pattern with colon
-            programme_pattern = r'^(.+?)\s*\(([A-Z]{4}\d{2})\):?.*$'
-            match = re.match(programme_pattern, line)
-            
-            if match and current_school != "Teaduskond määramata":
-                programme_name = match.group(1).strip()
-                full_code = match.group(2)
-                code_prefix = full_code[:4]
-                
-                if (len(programme_name) >= 3 and 
-                    programme_name not in valid_schools):
-                    
-                    # Use full code as key to avoid overwriting programmes with same 4-char prefix
-                    programme_school_map[full_code] = {
-                        'full_code': full_code,
-                        'programme_name': programme_name,
-                        'school': current_school,
-                        'code_prefix': code_prefix
-                    }
-                    
-                    print(f"  Programme: {programme_name} ({full_code}) -> {current_school}")
+        programme_school_map = replay_snapshot(page_text)
         
         print(f"\nTotal scraped: {len(programme_school_map)} programmes")
         
@@ -91,4 +58,4 @@ def simple_scrape_test():
         return {}
 
 if __name__ == "__main__":
-    simple_scrape_test()
\ No newline at end of file
+    simple_scrape_test()
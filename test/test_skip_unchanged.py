@@ -0,0 +1,44 @@
+import contextlib
+import io
+import json
+import shutil
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from benchmark_etl import REPO_DIR, generate_export
+from taltechkoikkavad import StageRunner, output_artifacts, run_etl
+
+def run(programme_school_map, csv_path, output_file, **options):
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        run_etl(programme_school_map, csv_path=csv_path, output_file=output_file, skip_unchanged=True,
+                stages=StageRunner(use_cache=True), **options)
+    return 'unchanged since the last run' in log.getvalue()
+
+def test_skip_needs_every_artifact_and_a_plain_run(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with open(REPO_DIR / "scraped_programmes.json", "r", encoding="utf-8") as f:
+        programme_school_map = json.load(f)
+    csv_path = generate_export(tmp_path / "Otsing_oppekavad.csv", 500)
+    output_file = tmp_path / "taltechkoikkavad.csv"
+    
+    assert not run(programme_school_map, csv_path, output_file)
+    assert run(programme_school_map, csv_path, output_file)
+    
+    # Runs that must produce something besides the outputs are never skipped
+    assert not run(programme_school_map, csv_path, output_file, memory_report=True)
+    assert not run(programme_school_map, csv_path, output_file, incremental=True)
+    
+    # A missing artifact is regenerated
+    for name, path in output_artifacts(output_file).items():
+        if name == 'arrow':
+            for version in path.parent.glob(f"{path.stem}-*{path.suffix}"):
+                version.unlink()
+        elif path.is_dir():
+            shutil.rmtree(path)
+        else:
+            path.unlink()
+        assert not run(programme_school_map, csv_path, output_file), name
+        assert run(programme_school_map, csv_path, output_file), name
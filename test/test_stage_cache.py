@@ -0,0 +1,40 @@
+import contextlib
+import io
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import faculty_rules
+import taltechkoikkavad
+from benchmark_etl import REPO_DIR, generate_export
+from taltechkoikkavad import StageRunner, run_etl
+
+def cached_stages(programme_school_map, csv_path):
+    """Run the pipeline with memoization on; returns {stage: served from cache}."""
+    stages = StageRunner(use_cache=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_etl(programme_school_map, csv_path=csv_path, output_file='taltechkoikkavad.csv', stages=stages)
+    return {timing['stage']: timing['cached'] for timing in stages.timings}
+
+def test_rules_change_only_reruns_the_map_stage(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with open(REPO_DIR / "scraped_programmes.json", "r", encoding="utf-8") as f:
+        programme_school_map = json.load(f)
+    csv_path = generate_export(tmp_path / "Otsing_oppekavad.csv", 500)
+    
+    first = cached_stages(programme_school_map, csv_path)
+    assert not first['reduce'] and not first['map']
+    
+    # Edit the rules file: only the mapping has to be recomputed
+    edited = tmp_path / 'faculty_rules.py'
+    edited.write_text(Path(faculty_rules.__file__).read_text(encoding='utf-8') + "\n# edited\n", encoding='utf-8')
+    monkeypatch.setattr(faculty_rules, '__file__', str(edited))
+    monkeypatch.setattr(taltechkoikkavad, '_source_hashes', {})
+    
+    second = cached_stages(programme_school_map, csv_path)
+    assert second['reduce'] and second['type']
+    assert not second['map']
+    
+    assert cached_stages(programme_school_map, csv_path)['map']
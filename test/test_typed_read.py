@@ -0,0 +1,28 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from benchmark_etl import EXPORT_COLUMNS, EXPORT_TITLE
+from taltechkoikkavad import parse_export, reduce_latest_versions
+
+def export_text(versions):
+    lines = [EXPORT_TITLE + ';' * (len(EXPORT_COLUMNS) - 1), ';'.join(EXPORT_COLUMNS)]
+    for version in versions:
+        lines.append(';'.join(['IACB17', version, 'Informaatika', 'Informatics', 'bakalaureuseõpe', '180,00',
+                               '6', 'Mari Maasikas', 'eesti', 'informaatika', 'kehtiv', '01.09.2017']))
+    return '\n'.join(lines) + '\n'
+
+def test_cached_text_dtype_does_not_change_version_order(tmp_path, monkeypatch):
+    """A layout first seen with text versions still picks the numerically latest numeric version."""
+    monkeypatch.chdir(tmp_path)
+    
+    # First export caches the version column as object
+    df, column_mapping = parse_export(export_text(['IACB17/17', 'IACB17/18']))
+    version_col = column_mapping['õppekavaversiooni kood']
+    assert df[version_col].dtype == object
+    
+    df, column_mapping = parse_export(export_text(['9', '10']))
+    
+    assert df[version_col].dtype.kind == 'i'
+    assert reduce_latest_versions(df, column_mapping)[version_col].tolist() == [10]
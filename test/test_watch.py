@@ -0,0 +1,51 @@
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from taltechkoikkavad import ExportEventHandler, export_settled
+
+def event(event_type, src_path, dest_path='', is_directory=False):
+    return SimpleNamespace(event_type=event_type, src_path=src_path, dest_path=dest_path,
+                           is_directory=is_directory)
+
+def test_export_is_due_once_events_stop():
+    """A burst of writes to one export yields that export once, after the quiet period."""
+    handler = ExportEventHandler()
+    
+    def write_in_chunks():
+        for _ in range(5):
+            handler.dispatch(event('modified', '/exports/Otsing_oppekavad.csv'))
+            time.sleep(0.05)
+    
+    writer = threading.Thread(target=write_in_chunks)
+    writer.start()
+    started = time.monotonic()
+    path = handler.next_due(debounce=0.3)
+    writer.join()
+    
+    assert path == Path('/exports/Otsing_oppekavad.csv')
+    assert time.monotonic() - started >= 0.5
+    assert handler.pending == {}
+
+def test_handler_ignores_non_exports():
+    """Directories, non-CSV files and Office lock files never become pending; renames count by target."""
+    handler = ExportEventHandler()
+    handler.dispatch(event('created', '/exports/sub', is_directory=True))
+    handler.dispatch(event('created', '/exports/notes.txt'))
+    handler.dispatch(event('created', '/exports/~$Otsing_oppekavad.csv'))
+    handler.dispatch(event('deleted', '/exports/old.csv'))
+    handler.dispatch(event('moved', '/exports/.tmp123', '/exports/Otsing_oppekavad.csv'))
+    
+    assert list(handler.pending) == [Path('/exports/Otsing_oppekavad.csv')]
+
+def test_export_settled(tmp_path):
+    export = tmp_path / 'Otsing_oppekavad.csv'
+    export.write_bytes(b'')
+    assert not export_settled(export)
+    export.write_bytes(b'Otsing \xf5ppekavad;\r\n')
+    assert export_settled(export)
+    assert not export_settled(tmp_path / 'missing.csv')